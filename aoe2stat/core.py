@@ -1,14 +1,35 @@
 from __future__ import annotations
 
+import io
+import os
+import threading
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from mgz.model import parse_match
 
 
+def file_key(path: str | Path) -> Tuple[str, int, int]:
+    """``(absolute path, mtime_ns, size)``: identifies one version of a file."""
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+
+@lru_cache(maxsize=1)
+def _read_replay(path: str, mtime_ns: int, size: int) -> bytes:
+    with open(path, 'rb') as fh:
+        return fh.read()
+
+
+def open_replay(replay_path: str | Path) -> io.BytesIO:
+    """In-memory handle over the replay, read from disk once per file version
+    so the match parse, sync walk and postgame lookup share a single read."""
+    return io.BytesIO(_read_replay(*file_key(replay_path)))
+
+
 def load_match(replay_path: str | Path):
-    with open(replay_path, 'rb') as fh:
-        return parse_match(fh)
+    return parse_match(open_replay(replay_path))
 
 
 def payload_unit_name(payload: Dict[str, Any]) -> Optional[str]:
@@ -24,36 +45,83 @@ def payload_unit_name(payload: Dict[str, Any]) -> Optional[str]:
     return name
 
 
-def _payload_strings(obj, depth=0, max_depth=2):
+# Value types that never carry a name/unit_name attribute. Matched on the exact
+# type: subclasses such as IntEnum members or namedtuples can carry a name.
+_NAMELESS_TYPES = frozenset({type(None), bool, int, float, bytes, list, tuple})
+
+
+def _collect_payload_strings(obj, depth: int, max_depth: int, out: List[str]) -> None:
     if depth > max_depth:
         return
     if isinstance(obj, dict):
         for v in obj.values():
-            yield from _payload_strings(v, depth + 1, max_depth)
-    else:
+            _collect_payload_strings(v, depth + 1, max_depth, out)
+    elif type(obj) is str:
+        out.append(obj)
+    elif type(obj) not in _NAMELESS_TYPES:
         name = getattr(obj, 'name', None) or getattr(obj, 'unit_name', None)
         if isinstance(name, str):
-            yield name
+            out.append(name)
         if isinstance(obj, str):
-            yield obj
+            out.append(obj)
+
+
+def _payload_strings(obj, depth=0, max_depth=2) -> List[str]:
+    out: List[str] = []
+    _collect_payload_strings(obj, depth, max_depth, out)
+    return out
+
+
+# Candidate strings per payload, keyed by id(); the payload itself is kept in
+# the entry so its id cannot be reused while cached.
+_STRINGS_CACHE: Dict[int, Tuple[Any, Tuple[str, ...]]] = {}
+_STRINGS_CACHE_MAX = 8192
+_STRINGS_CACHE_LOCK = threading.Lock()  # eviction iterates the dict
+
+
+def _payload_string_tuple(payload: Dict[str, Any]) -> Tuple[str, ...]:
+    if not payload:
+        return ()
+    hit = _STRINGS_CACHE.get(id(payload))
+    if hit is not None and hit[0] is payload:
+        return hit[1]
+    strings = tuple(str(s) for s in _payload_strings(payload))
+    with _STRINGS_CACHE_LOCK:
+        if len(_STRINGS_CACHE) >= _STRINGS_CACHE_MAX:
+            _STRINGS_CACHE.pop(next(iter(_STRINGS_CACHE)))
+        _STRINGS_CACHE[id(payload)] = (payload, strings)
+    return strings
+
+
+@lru_cache(maxsize=4096)
+def _match_name(pattern, name: str) -> bool:
+    return pattern.search(name) is not None
 
 
 def payload_matches(payload: Dict[str, Any], pattern) -> bool:
     name = payload_unit_name(payload)
-    if name and pattern.search(str(name)):
+    if name and _match_name(pattern, str(name)):
         return True
-    for s in _payload_strings(payload):
-        try:
-            if pattern.search(str(s)):
-                return True
-        except Exception:
-            continue
+    for s in _payload_string_tuple(payload):
+        if _match_name(pattern, s):
+            return True
     return False
 
 
+_COUNT_KEYS = ('count', 'amount', 'quantity', 'num', 'n')
+
+
 def payload_count(payload: Dict[str, Any]) -> int:
-    for k in ('count', 'amount', 'quantity', 'num', 'n'):
+    # Absent keys and plain ints skip the try/except; other values still fall
+    # through to the next key when they are not a positive integer.
+    for k in _COUNT_KEYS:
         v = payload.get(k)
+        if v is None:
+            continue
+        if type(v) is int:
+            if v > 0:
+                return v
+            continue
         try:
             iv = int(v)
             if iv > 0:
@@ -61,4 +129,3 @@ def payload_count(payload: Dict[str, Any]) -> int:
         except Exception:
             pass
     return 1
-
@@ -1,8 +1,15 @@
 from __future__ import annotations
 
-from typing import Dict, Tuple
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, List, Pattern, Tuple
 import re
 
+try:
+    import ahocorasick  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    ahocorasick = None
+
 ResourceCost = Tuple[int, int, int, int]  # food, wood, gold, stone
 
 
@@ -107,31 +114,104 @@ _TECH_COSTS: Dict[str, ResourceCost] = {
 }
 
 
-def _lookup(name: str, table: Dict[str, ResourceCost]) -> ResourceCost | None:
-    n = _norm(name)
+class _SubstringIndex:
+    """Find the first key (in table order) where ``k in n or n in k``.
+
+    ``k in n`` runs an Aho-Corasick automaton when ``pyahocorasick`` is
+    installed; otherwise a lookahead alternation yields the longest key at each
+    position and its precomputed prefix keys cover the shorter ones.
+    ``n in k`` is a single ``str.find`` over the NUL-joined keys.
+    """
+
+    def __init__(self, table: Dict[str, ResourceCost]):
+        keys = list(table.keys())
+        self.values = list(table.values())
+        self.haystack = '\0'.join(keys)
+        self.starts: List[int] = []
+        pos = 0
+        for k in keys:
+            self.starts.append(pos)
+            pos += len(k) + 1
+        if ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            for i, k in enumerate(keys):
+                self.automaton.add_word(k, i)
+            self.automaton.make_automaton()
+        else:
+            self.automaton = None
+            longest_first = sorted(keys, key=len, reverse=True)
+            self.regex = re.compile('(?=(' + '|'.join(re.escape(k) for k in longest_first) + '))')
+            self.prefix_idx = {k: min(i for i, k2 in enumerate(keys) if k.startswith(k2)) for k in keys}
+
+    def first(self, n: str) -> ResourceCost | None:
+        best = len(self.values)
+        if n:
+            if self.automaton is not None:
+                for _, i in self.automaton.iter(n):
+                    best = min(best, i)
+            else:
+                for m in self.regex.finditer(n):
+                    best = min(best, self.prefix_idx[m.group(1)])
+        if '\0' not in n:
+            pos = self.haystack.find(n)
+            if pos != -1:
+                best = min(best, bisect_right(self.starts, pos) - 1)
+        return self.values[best] if best < len(self.values) else None
+
+
+# Word-boundary patterns are compiled once per table: a combined alternation to
+# reject misses in a single search, plus per-key patterns kept in table order.
+def _word_patterns(table: Dict[str, ResourceCost]) -> Tuple[Pattern[str], List[Tuple[Pattern[str], ResourceCost]]]:
+    combined = re.compile('|'.join(rf"\b{re.escape(k)}\b" for k in table))
+    per_key = [(re.compile(rf"\b{re.escape(k)}\b"), v) for k, v in table.items()]
+    return combined, per_key
+
+
+# Keys are normalised once here; lookups then only normalise the query.
+def _index(table: Dict[str, ResourceCost]):
+    table = {_norm(k): v for k, v in table.items()}
+    return table, _word_patterns(table), _SubstringIndex(table)
+
+
+_INDEX = {
+    'unit': _index(_UNIT_COSTS),
+    'building': _index(_BUILDING_COSTS),
+    'tech': _index(_TECH_COSTS),
+}
+
+
+def _lookup(n: str, table: Dict[str, ResourceCost], patterns, substrings: _SubstringIndex) -> ResourceCost | None:
+    # n is already normalised (see _norm)
     if n in table:
         return table[n]
     # loose match by substring
-    for k, v in table.items():
-        if n == k:
-            return v
-        if k in n or n in k:
-            return v
-    # regex match start word
-    for k, v in table.items():
-        if re.search(rf"\b{re.escape(k)}\b", n):
+    hit = substrings.first(n)
+    if hit is not None:
+        return hit
+    # regex match start word; one combined search rejects misses, then keep table order
+    combined, per_key = patterns
+    if not combined.search(n):
+        return None
+    for pat, v in per_key:
+        if pat.search(n):
             return v
     return None
 
 
+# Memoised on (table, normalised name) so 'Villager' and 'villager' share a slot.
+@lru_cache(maxsize=4096)
+def _cost(tag: str, n: str) -> ResourceCost | None:
+    table, patterns, substrings = _INDEX[tag]
+    return _lookup(n, table, patterns, substrings)
+
+
 def unit_cost(name: str) -> ResourceCost | None:
-    return _lookup(name, _UNIT_COSTS)
+    return _cost('unit', _norm(name))
 
 
 def building_cost(name: str) -> ResourceCost | None:
-    return _lookup(name, _BUILDING_COSTS)
+    return _cost('building', _norm(name))
 
 
 def tech_cost(name: str) -> ResourceCost | None:
-    return _lookup(name, _TECH_COSTS)
-
+    return _cost('tech', _norm(name))
@@ -1,139 +1,380 @@
 from __future__ import annotations
 
+import re
+import threading
+import weakref
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from operator import attrgetter
 from pathlib import Path
 from typing import Any, Dict, List, Tuple
 
 import numpy as np
 import pandas as pd
 
-from .core import payload_matches, payload_count
+from .core import file_key, open_replay, payload_matches, payload_count
 from .costs import unit_cost, building_cost, tech_cost
 
 
+@dataclass(frozen=True, eq=False)
+class TimeSeries:
+    """Per-player series binned by window, without the DataFrame overhead.
+
+    ``values[i, j]`` is player ``players[j]`` in the window starting at
+    ``index[i]`` seconds. ``to_dataframe()`` gives the classic DataFrame
+    (index ``time_sec``, one column per player id).
+    """
+
+    index: np.ndarray
+    values: np.ndarray
+    players: np.ndarray
+
+    @classmethod
+    def empty_series(cls) -> 'TimeSeries':
+        return cls(np.empty(0), np.empty((0, 0)), np.empty(0, dtype=np.int64))
+
+    @property
+    def empty(self) -> bool:
+        return self.values.size == 0
+
+    def column(self, pid: int) -> np.ndarray:
+        return self.values[:, int(np.flatnonzero(self.players == pid)[0])]
+
+    def select(self, pids) -> 'TimeSeries':
+        keep = np.isin(self.players, list(pids))
+        return TimeSeries(self.index, self.values[:, keep], self.players[keep])
+
+    def to_dataframe(self) -> pd.DataFrame:
+        if not len(self.players) and not len(self.index):
+            return pd.DataFrame()
+        ts = pd.DataFrame(self.values, index=self.index, columns=self.players)
+        ts.index.name = 'time_sec'
+        return ts
+
+
+def _timeseries_result(ts: TimeSeries, return_dataframe: bool):
+    return ts.to_dataframe() if return_dataframe else ts
+
+
+# TRAIN/CREATE/QUEUE anywhere in the type name, or exactly ORDER. Substring
+# (not set membership) so MULTIQUEUE/DE_QUEUE-style variants keep counting;
+# memoised since there are only a few dozen distinct action type names.
+_PROD_RE = re.compile(r'TRAIN|CREATE|QUEUE|\AORDER\Z').search
+
+
+@lru_cache(maxsize=256)
 def _is_prod_event(tname: str) -> bool:
-    return ('TRAIN' in tname) or ('CREATE' in tname) or ('QUEUE' in tname) or (tname == 'ORDER')
+    return _PROD_RE(tname) is not None
+
+
+# (name, production flag) per action-type object (mgz type enums are singletons).
+# Keyed by id() with the object kept alongside so the id cannot be recycled.
+_TYPE_INFO_CACHE: Dict[int, Tuple[Any, str, bool]] = {}
+_TYPE_INFO_CACHE_MAX = 1024
+
+
+def _type_info(act_type) -> Tuple[str, bool]:
+    hit = _TYPE_INFO_CACHE.get(id(act_type))
+    if hit is not None and hit[0] is act_type:
+        return hit[1], hit[2]
+    name = getattr(act_type, 'name', '') or ''
+    prod = _is_prod_event(name)
+    if len(_TYPE_INFO_CACHE) >= _TYPE_INFO_CACHE_MAX:
+        _TYPE_INFO_CACHE.clear()
+    _TYPE_INFO_CACHE[id(act_type)] = (act_type, name, prod)
+    return name, prod
+
+
+# Per-match derived data (action arrays, filtered actions). Keyed by id(match),
+# guarded by a weakref plus the identity/length of match.actions so a recycled
+# id or a replaced action list never serves stale entries. The lock makes the
+# lookup/sweep/insert safe when metrics run from worker threads; concurrent
+# first computations of the same entry are harmless (identical results).
+_MATCH_CACHE: Dict[int, Tuple[Any, int, int, Dict[str, Any]]] = {}
+_MATCH_CACHE_LOCK = threading.Lock()
+
+
+def _match_cache(match) -> Dict[str, Any]:
+    actions = match.actions
+    with _MATCH_CACHE_LOCK:
+        entry = _MATCH_CACHE.get(id(match))
+        if entry is not None and entry[0]() is match and entry[1] == id(actions) and entry[2] == len(actions):
+            return entry[3]
+        for key in [k for k, e in _MATCH_CACHE.items() if e[0]() is None]:
+            del _MATCH_CACHE[key]
+        try:
+            ref = weakref.ref(match)
+        except TypeError:
+            return {}  # not weak-referenceable: compute without caching
+        store: Dict[str, Any] = {}
+        _MATCH_CACHE[id(match)] = (ref, id(actions), len(actions), store)
+        return store
+
+
+_player_number = attrgetter('player.number')
+
+_ACTION_DTYPE = np.dtype([('t', 'f8'), ('pid', 'i8'), ('tcode', 'i4'), ('prod', '?')])
+
+
+def _action_records(match):
+    """Structured array with one record per action, built once per match.
+
+    Fields: ``t`` (seconds), ``pid`` (-1 when absent), ``tcode`` (index into
+    the returned type-name -> code map) and ``prod`` (production event).
+    """
+    store = _match_cache(match)
+    hit = store.get('records')
+    if hit is not None:
+        return hit
+    actions = match.actions
+    rec = np.empty(len(actions), dtype=_ACTION_DTYPE)
+    codes: Dict[str, int] = {}
+    t, pid, tcode, prod = rec['t'], rec['pid'], rec['tcode'], rec['prod']
+    for i, act in enumerate(actions):
+        t[i] = act.timestamp.total_seconds()
+        try:
+            num = _player_number(act)
+        except AttributeError:  # no player (or player is None)
+            num = None
+        pid[i] = -1 if num is None else num
+        name, is_prod = _type_info(getattr(act, 'type', None))
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(codes)
+        tcode[i] = code
+        prod[i] = is_prod
+    rec.flags.writeable = False
+    store['records'] = (rec, codes)
+    return store['records']
+
+
+def _type_mask(match, names) -> np.ndarray:
+    """Boolean mask of actions whose type name is in ``names``."""
+    rec, codes = _action_records(match)
+    return np.isin(rec['tcode'], [codes[n] for n in names if n in codes])
+
+
+def _action_index(match):
+    """Contiguous per-action timestamp, player and production arrays, plus
+    the ``(index, action)`` list of production events. Built once per match.
+    """
+    store = _match_cache(match)
+    hit = store.get('actions')
+    if hit is not None:
+        return hit
+    rec, _ = _action_records(match)
+    t = np.ascontiguousarray(rec['t'])
+    pid = np.ascontiguousarray(rec['pid'])
+    prod = np.ascontiguousarray(rec['prod'])
+    for arr in (t, pid, prod):
+        arr.flags.writeable = False
+    actions = match.actions
+    prod_actions = [(int(i), actions[i]) for i in np.flatnonzero(prod)]
+    store['actions'] = (t, pid, prod, prod_actions)
+    return store['actions']
+
+
+def _filter_actions(match) -> List[Tuple[int, Any]]:
+    """``(index, action)`` for production events only, computed once per match."""
+    return _action_index(match)[3]
+
+
+def _extract_action_arrays(match, pattern=None):
+    """Parallel NumPy arrays over ``match.actions``.
+
+    Returns ``(t, pid, prod, matched, w)``: timestamp seconds, player number
+    (-1 when absent), production-event flag, ``pattern`` hit on production
+    events and ``payload_count`` weight for those hits (1 elsewhere). The
+    first three are shared per match and read-only.
+    """
+    t, pid, prod, prod_actions = _action_index(match)
+    matched = np.zeros(len(t), dtype=np.bool_)
+    w = np.ones(len(t), dtype=np.int64)
+    if pattern is not None:
+        for i, act in prod_actions:
+            payload = getattr(act, 'payload', {}) or {}
+            if payload_matches(payload, pattern):
+                matched[i] = True
+                w[i] = payload_count(payload)
+    return t, pid, prod, matched, w
+
+
+def _n_slots(match, pid: np.ndarray) -> int:
+    hi = max([int(p.number) for p in match.players] + [int(pid.max()) if pid.size else -1])
+    return hi + 1
+
+
+def _bin_index(t: np.ndarray, bins: np.ndarray) -> np.ndarray:
+    """``np.histogram`` bin of each ``t`` (last bin closed; -1 / n_bins outside).
+
+    Uniform edges (every caller bins on ``np.arange``) use one divide instead
+    of a binary search; the estimate is then corrected against the actual
+    edges, since rounding in ``t / step`` can land one bin off.
+    """
+    n_bins = len(bins) - 1
+    step = bins[1] - bins[0] if n_bins > 0 else 0.0
+    if step > 0 and np.all(np.diff(bins) == step):
+        est = np.nan_to_num(np.floor((t - bins[0]) / step), nan=n_bins)
+        bi = np.clip(est, -1, n_bins).astype(np.int64)
+        edges = np.concatenate(([-np.inf], bins, [np.inf]))
+        bi -= t < edges[bi + 1]
+        bi += t >= edges[bi + 2]
+    else:
+        bi = np.searchsorted(bins, t, side='right') - 1
+    bi[t == bins[-1]] = n_bins - 1
+    return bi
+
+
+def _bin_by_player(t: np.ndarray, pid: np.ndarray, bins: np.ndarray, weights: np.ndarray | None = None):
+    """Per-player histogram of ``t`` over ``bins`` with one flat ``np.bincount``.
+
+    Bin edges follow ``np.histogram`` (last bin closed). Returns players in
+    first-appearance order and a ``(n_players, n_bins)`` matrix.
+    """
+    n_bins = len(bins) - 1
+    codes, players = pd.factorize(pid)
+    bi = _bin_index(t, bins)
+    keep = (bi >= 0) & (bi < n_bins)
+    flat = np.bincount(
+        codes[keep].astype(np.int64) * n_bins + bi[keep],
+        weights=None if weights is None else weights[keep],
+        minlength=len(players) * n_bins,
+    )
+    return players, flat.reshape(len(players), n_bins)
 
 
 def villager_counts(match, villager_pattern) -> Dict[int, int]:
     counts: Dict[int, int] = {p.number: 0 for p in match.players}
-    for act in match.actions:
-        tname = getattr(getattr(act, 'type', None), 'name', '')
-        if not _is_prod_event(tname):
-            continue
-        if not payload_matches(getattr(act, 'payload', {}) or {}, villager_pattern):
-            continue
-        pid = getattr(getattr(act, 'player', None), 'number', None)
-        if pid is not None:
-            counts[pid] += payload_count(getattr(act, 'payload', {}) or {})
+    _, pid, prod, matched, w = _extract_action_arrays(match, villager_pattern)
+    mask = prod & matched & (pid >= 0)
+    per_slot = np.zeros(_n_slots(match, pid), dtype=np.int64)
+    np.add.at(per_slot, pid[mask], w[mask])
+    for p in np.unique(pid[mask]):
+        counts[int(p)] = counts.get(int(p), 0) + int(per_slot[p])
     return counts
 
 
-def apm_timeseries(match, window_sec: int) -> pd.DataFrame:
-    rows = [(act.timestamp.total_seconds(), act.player.number)
-            for act in match.actions if getattr(act, 'player', None)]
-    if not rows:
-        return pd.DataFrame()
-    df = pd.DataFrame(rows, columns=['t', 'player'])
-    max_t = df['t'].max()
+def apm_timeseries(match, window_sec: int, return_dataframe: bool = False) -> TimeSeries | pd.DataFrame:
+    t, pid, _, _, _ = _extract_action_arrays(match)
+    has_player = pid >= 0
+    if not has_player.any():
+        return _timeseries_result(TimeSeries.empty_series(), return_dataframe)
+    t, pid = t[has_player], pid[has_player]
+    max_t = t.max()
     bins = np.arange(0, max_t + window_sec, window_sec)
-    apm: Dict[int, Any] = {}
-    for pid in df['player'].unique():
-        counts, _ = np.histogram(df.loc[df['player'] == pid, 't'], bins=bins)
-        apm[int(pid)] = counts * 60 / window_sec
-    ts = pd.DataFrame(apm, index=bins[:-1])
-    ts.index.name = 'time_sec'
-    return ts
+    players, counts = _bin_by_player(t, pid, bins)
+    ts = TimeSeries(bins[:-1], (counts * 60 / window_sec).T, np.asarray(players, dtype=np.int64))
+    return _timeseries_result(ts, return_dataframe)
+
+
+def unit_created_timeseries(match, unit_pattern, window_sec: int, return_dataframe: bool = False) -> TimeSeries | pd.DataFrame:
+    t, pid, prod, matched, w = _extract_action_arrays(match, unit_pattern)
+    mask = prod & matched & (pid >= 0)
+    if not mask.any():
+        return _timeseries_result(TimeSeries.empty_series(), return_dataframe)
+    t, pid, w = t[mask], pid[mask], w[mask]
+    max_t = t.max()
+    bins = np.arange(0, max_t + window_sec, window_sec)
+    players, counts = _bin_by_player(t, pid, bins, weights=w)
+    ts = TimeSeries(bins[:-1], counts.astype(int).T, np.asarray(players, dtype=np.int64))
+    return _timeseries_result(ts, return_dataframe)
 
 
-def unit_created_timeseries(match, unit_pattern, window_sec: int) -> pd.DataFrame:
-    rows = []  # (t, player, w)
-    for act in match.actions:
-        tname = getattr(getattr(act, 'type', None), 'name', '')
-        if not _is_prod_event(tname):
-            continue
-        payload = getattr(act, 'payload', {}) or {}
-        if not payload_matches(payload, unit_pattern):
-            continue
-        if not getattr(act, 'player', None):
-            continue
-        rows.append((act.timestamp.total_seconds(), act.player.number, payload_count(payload)))
-    if not rows:
-        return pd.DataFrame()
-    df = pd.DataFrame(rows, columns=['t', 'player', 'w'])
-    max_t = df['t'].max()
-    bins = np.arange(0, max_t + window_sec, window_sec)
-    out: Dict[int, Any] = {}
-    for pid in df['player'].unique():
-        mask = (df['player'] == pid)
-        counts, _ = np.histogram(df.loc[mask, 't'], bins=bins, weights=df.loc[mask, 'w'])
-        out[int(pid)] = counts.astype(int)
-    ts = pd.DataFrame(out, index=bins[:-1])
-    ts.index.name = 'time_sec'
-    return ts
+def _tc_idle_increments(match, villager_pattern, base_prod_time: float, gap_threshold: float):
+    """Idle increments per villager event: gap to the same player's previous
+    event (in action order) beyond ``gap_threshold``, minus ``base_prod_time``.
+
+    Returns ``(t, pid, inc)`` for the events that count, in action order.
+    """
+    t, pid, prod, matched, _ = _extract_action_arrays(match, villager_pattern)
+    sel = np.flatnonzero(prod & matched & (pid >= 0))
+    # group by player, keeping action order within each group
+    order = sel[np.argsort(pid[sel], kind='stable')]
+    gap = np.diff(t[order])
+    hit = (pid[order][1:] == pid[order][:-1]) & (gap > gap_threshold)
+    idx = order[1:][hit]
+    inc = np.maximum(0.0, gap[hit] - base_prod_time)
+    back = np.argsort(idx, kind='stable')
+    idx = idx[back]
+    return t[idx], pid[idx], inc[back]
 
 
 def tc_idle_time(match, villager_pattern, base_prod_time: float = 25.0, gap_threshold: float = 27.0):
     idle = {p.number: 0.0 for p in match.players}
-    last_train = {p.number: None for p in match.players}
-    for act in match.actions:
-        tname = getattr(getattr(act, 'type', None), 'name', '')
-        if not _is_prod_event(tname):
-            continue
-        payload = getattr(act, 'payload', {}) or {}
-        if not payload_matches(payload, villager_pattern):
-            continue
-        pid = getattr(getattr(act, 'player', None), 'number', None)
-        if pid is None:
-            continue
-        t = act.timestamp.total_seconds()
-        if last_train[pid] is not None:
-            gap = t - last_train[pid]
-            if gap > gap_threshold:
-                idle[pid] += max(0.0, gap - base_prod_time)
-        last_train[pid] = t
+    _, pid, inc = _tc_idle_increments(match, villager_pattern, base_prod_time, gap_threshold)
+    # bincount accumulates in action order, matching the sequential += per player
+    sums = np.bincount(pid, weights=inc, minlength=_n_slots(match, pid))
+    for p in np.unique(pid):
+        idle[int(p)] = idle.get(int(p), 0.0) + float(sums[p])
     return idle
 
 
-def tc_idle_cumulative_timeseries(match, villager_pattern, window_sec: int, base_prod_time: float = 25.0, gap_threshold: float = 27.0) -> pd.DataFrame:
-    incs = {p.number: [] for p in match.players}
-    last = {p.number: None for p in match.players}
-    for act in match.actions:
-        tname = getattr(getattr(act, 'type', None), 'name', '')
-        if not _is_prod_event(tname):
-            continue
-        payload = getattr(act, 'payload', {}) or {}
-        if not payload_matches(payload, villager_pattern):
-            continue
-        pid = getattr(getattr(act, 'player', None), 'number', None)
-        if pid is None:
-            continue
-        t = act.timestamp.total_seconds()
-        if last[pid] is not None:
-            gap = t - last[pid]
-            if gap > gap_threshold:
-                inc = max(0.0, gap - base_prod_time)
-                incs[pid].append((t, inc))
-        last[pid] = t
-    all_times = []
-    for pairs in incs.values():
-        all_times += [t for t, _ in pairs]
-    if not all_times:
-        return pd.DataFrame()
-    max_t = max(all_times)
+def tc_idle_cumulative_timeseries(match, villager_pattern, window_sec: int, base_prod_time: float = 25.0, gap_threshold: float = 27.0, return_dataframe: bool = False) -> TimeSeries | pd.DataFrame:
+    t_all, pid_all, inc_all = _tc_idle_increments(match, villager_pattern, base_prod_time, gap_threshold)
+    pids = list(dict.fromkeys(p.number for p in match.players))
+    keep = np.isin(pid_all, pids)
+    # one stable sort by (player, time): each player's increments are a contiguous slice
+    order = np.lexsort((t_all[keep], pid_all[keep]))
+    t_all, pid_all, inc_all = t_all[keep][order], pid_all[keep][order], inc_all[keep][order]
+    if not t_all.size:
+        return _timeseries_result(TimeSeries.empty_series(), return_dataframe)
+    max_t = t_all.max()
     bins = np.arange(0, max_t + window_sec, window_sec)
-    out: Dict[int, Any] = {}
-    for pid, pairs in incs.items():
-        if not pairs:
+    players: List[int] = []
+    cols: List[np.ndarray] = []
+    starts = np.searchsorted(pid_all, pids, side='left')
+    ends = np.searchsorted(pid_all, pids, side='right')
+    for pid, lo, hi in zip(pids, starts, ends):
+        if lo == hi:
             continue
-        pairs.sort(key=lambda x: x[0])
-        t_arr = np.array([t for t, _ in pairs], dtype=float)
-        inc_arr = np.array([v for _, v in pairs], dtype=float)
-        cum = np.cumsum(inc_arr)
-        s = pd.Series(cum, index=t_arr)
-        out[int(pid)] = s.reindex(bins, method='ffill').fillna(0.0).values[:-1]
-    ts = pd.DataFrame(out, index=bins[:-1])
-    ts.index.name = 'time_sec'
-    return ts
+        t_arr = t_all[lo:hi]
+        cum = np.cumsum(inc_all[lo:hi])
+        # forward-fill onto window starts: last increment at or before each start, else 0
+        idx = np.searchsorted(t_arr, bins[:-1], side='right') - 1
+        players.append(int(pid))
+        cols.append(np.where(idx >= 0, cum[np.maximum(idx, 0)], 0.0))
+    ts = TimeSeries(bins[:-1], np.column_stack(cols), np.asarray(players, dtype=np.int64))
+    return _timeseries_result(ts, return_dataframe)
+
+
+# Every key (lowercased) that norm_bucket in resource_totals_postgame reads.
+_BUCKET_KEYS = frozenset({
+    'total_collected', 'economy',
+    'food', 'food_collected', 'total_food',
+    'wood', 'wood_collected', 'total_wood',
+    'gold', 'gold_collected', 'total_gold',
+    'stone', 'stone_collected', 'total_stone',
+})
+
+
+def _walk_dict(obj, idx, stack, record) -> None:
+    record(obj, idx_for_fallback=idx)
+    stack.extend((v, None) for v in reversed(list(obj.values())))
+
+
+def _walk_list(obj, idx, stack, record) -> None:
+    stack.extend((v, i) for i, v in reversed(list(enumerate(obj))))
+
+
+def _walk_skip(obj, idx, stack, record) -> None:
+    return None
+
+
+# type(obj) -> handler for the postgame walk; subclasses (e.g. construct
+# Containers) are resolved once with issubclass and cached here.
+_WALK_DISPATCH: Dict[type, Any] = {dict: _walk_dict, list: _walk_list}
+
+
+def _walk_handler(tp: type):
+    if issubclass(tp, dict):
+        handler = _walk_dict
+    elif issubclass(tp, list):
+        handler = _walk_list
+    else:
+        handler = _walk_skip
+    _WALK_DISPATCH[tp] = handler
+    return handler
 
 
 def resource_totals_postgame(path: Path) -> Dict[int, Dict[str, float]]:
@@ -142,12 +383,28 @@ def resource_totals_postgame(path: Path) -> Dict[int, Dict[str, float]]:
     Returns mapping: pid -> {'food': x, 'wood': y, 'gold': z, 'stone': w}
     Tries multiple known shapes from mgz.fast.postgame output. Falls back to
     sequential player indexing (1..N) when explicit ids are absent.
+
+    Results are memoised per file (path, mtime, size): the GUI asks again on
+    every window/resource change. Each call gets its own copy.
     """
+    try:
+        key = file_key(path)
+    except OSError:
+        return _resource_totals_postgame(path)
+    totals = _totals_cached(*key)
+    return {pid: dict(bucket) for pid, bucket in totals.items()}
+
+
+@lru_cache(maxsize=16)
+def _totals_cached(path: str, mtime_ns: int, size: int) -> Dict[int, Dict[str, float]]:
+    return _resource_totals_postgame(path)
+
+
+def _resource_totals_postgame(path: Path) -> Dict[int, Dict[str, float]]:
     # 1) Try fast postgame first
     try:
         import mgz.fast as _mgz_fast  # type: ignore
-        with open(path, 'rb') as fh:
-            data = _mgz_fast.postgame(fh)
+        data = _mgz_fast.postgame(open_replay(path))
     except Exception:
         data = {}  # type: ignore
 
@@ -160,17 +417,34 @@ def resource_totals_postgame(path: Path) -> Dict[int, Dict[str, float]]:
         except Exception:
             return 0.0
 
+    # norm_bucket result per dict: nested 'economy' dicts and the containers
+    # inspected first are reached again by the deep walk. ``data`` keeps every
+    # dict alive for the duration of the call, so ids are stable.
+    bucket_memo: Dict[int, Dict[str, float] | None] = {}
+
     def norm_bucket(d: Dict[str, Any]) -> Dict[str, float] | None:
-        # Direct keys
-        keys = {k.lower() for k in d.keys()}
+        key = id(d)
+        if key in bucket_memo:
+            return bucket_memo[key]
+        bucket = bucket_memo[key] = _norm_bucket(d)
+        return bucket
+
+    def _norm_bucket(d: Dict[str, Any]) -> Dict[str, float] | None:
+        # Direct keys: lowercased once per dict (first original key wins)
+        keys: Dict[str, Any] = {}
+        for k in d.keys():
+            keys.setdefault(k.lower(), k)
+        # Early exit: no recognised key means no bucket at any level below
+        if _BUCKET_KEYS.isdisjoint(keys):
+            return None
+
         def pick(*names: str) -> float | None:
             for n in names:
                 if n in d:
                     return as_float(d[n])
                 # try case-insensitive
-                for k in d.keys():
-                    if k.lower() == n:
-                        return as_float(d[k])
+                if n in keys:
+                    return as_float(d[keys[n]])
             return None
 
         # Nested under 'total_collected'
@@ -242,20 +516,13 @@ def resource_totals_postgame(path: Path) -> Dict[int, Dict[str, float]]:
                             if b is not None:
                                 results[pid] = b
 
-    # Generic deep walk as a last resort
-    def walk(obj: Any):
-        if isinstance(obj, dict):
-            maybe_record(obj)
-            for v in obj.values():
-                walk(v)
-        elif isinstance(obj, list):
-            for i, v in enumerate(obj):
-                if isinstance(v, dict):
-                    maybe_record(v, idx_for_fallback=i)
-                walk(v)
-
+    # Generic deep walk as a last resort (explicit stack, same pre-order as recursion)
     if not results:
-        walk(data)
+        stack: List[Tuple[Any, int | None]] = [(data, None)]
+        while stack:
+            obj, idx = stack.pop()
+            handler = _WALK_DISPATCH.get(type(obj)) or _walk_handler(type(obj))
+            handler(obj, idx, stack, maybe_record)
 
     if results:
         return results
@@ -263,14 +530,14 @@ def resource_totals_postgame(path: Path) -> Dict[int, Dict[str, float]]:
     # 2) Try achievements via mgz.summary Summary/FullSummary
     try:
         import mgz.summary as _mgz_summary  # type: ignore
-        with open(path, 'rb') as fh:
-            # Summary is cheaper; FullSummary may have more filled fields in some cases
-            summ = _mgz_summary.Summary(fh)
+        fh = open_replay(path)
+        # Summary is cheaper; FullSummary may have more filled fields in some cases
+        summ = _mgz_summary.Summary(fh)
+        players = summ.get_players()
+        if not players:
+            fh.seek(0)
+            summ = _mgz_summary.FullSummary(fh)
             players = summ.get_players()
-            if not players:
-                fh.seek(0)
-                summ = _mgz_summary.FullSummary(fh)
-                players = summ.get_players()
         tmp: Dict[int, Dict[str, float]] = {}
         for p in players or []:
             pid = int(p.get('number')) if p.get('number') is not None else None
@@ -296,24 +563,45 @@ def resource_totals_postgame(path: Path) -> Dict[int, Dict[str, float]]:
     return out
 
 
-def resource_cumulative_timeseries(match, per_player_totals: Dict[int, Dict[str, float]], resource: str, window_sec: int) -> pd.DataFrame:
+def resource_cumulative_timeseries(match, per_player_totals: Dict[int, Dict[str, float]], resource: str, window_sec: int, return_dataframe: bool = False) -> TimeSeries | pd.DataFrame:
     res = resource.lower()
     if res not in ('food', 'wood', 'gold', 'stone'):
         raise ValueError('Recurso no soportado')
     max_t = match.duration.total_seconds()
     bins = np.arange(0, max_t + window_sec, window_sec)
-    out: Dict[int, Any] = {}
-    for p in match.players:
-        pid = int(p.number)
-        total_val = float((per_player_totals.get(pid) or {}).get(res, 0.0))
-        out[pid] = np.linspace(0.0, total_val, num=len(bins) - 1)
-    ts = pd.DataFrame(out, index=bins[:-1])
-    ts.index.name = 'time_sec'
-    return ts
+    pids = [int(p.number) for p in match.players]
+    totals = np.array([float((per_player_totals.get(pid) or {}).get(res, 0.0)) for pid in pids], dtype=np.float64)
+    # One vectorised linspace (row per player); same values as a per-player linspace
+    ramps = np.linspace(0.0, totals, num=len(bins) - 1, axis=1)
+    ts = TimeSeries(bins[:-1], ramps.T, np.asarray(pids, dtype=np.int64))
+    return _timeseries_result(ts, return_dataframe)
 
 
 # ---- Estimated spend/balance based on actions ----
 
+# Action types _resource_delta_for_action can return a delta for.
+_DELTA_TYPES = ('DE_QUEUE', 'QUEUE', 'ORDER', 'TRAIN', 'CREATE', 'BUILD', 'RESEARCH', 'BUY', 'SELL')
+
+
+def _delta_indices(match) -> np.ndarray:
+    """Indices of actions with a player whose type can carry a resource delta."""
+    rec, _ = _action_records(match)
+    return np.flatnonzero(_type_mask(match, _DELTA_TYPES) & (rec['pid'] >= 0))
+
+
+_COST_LOOKUPS = {'unit': unit_cost, 'building': building_cost, 'tech': tech_cost}
+
+
+@lru_cache(maxsize=1024)
+def _spend_for(kind: str, name: str) -> Tuple[int, int, int, int] | None:
+    """Negated cost of one unit/building/tech by raw payload name (names repeat a lot)."""
+    cost = _COST_LOOKUPS[kind](name)
+    if not cost:
+        return None
+    f, w, g, s = cost
+    return (-f, -w, -g, -s)
+
+
 def _resource_delta_for_action(act) -> Tuple[int, int, int, int] | None:
     """Return resource deltas (food, wood, gold, stone) for a single action.
     Spends are negative; market BUY/SELL applies delta only to the named resource.
@@ -325,26 +613,23 @@ def _resource_delta_for_action(act) -> Tuple[int, int, int, int] | None:
         # Units (we key off unit if present)
         name = payload.get('unit') or payload.get('unit_name') or payload.get('object_name')
         if name:
-            cost = unit_cost(str(name))
-            if cost:
+            spend = _spend_for('unit', str(name))
+            if spend:
                 amt = int(payload.get('amount') or 1)
-                f, w, g, s = cost
-                return (-f * amt, -w * amt, -g * amt, -s * amt)
+                f, w, g, s = spend
+                return (f * amt, w * amt, g * amt, s * amt)
     if tname == 'BUILD':
         name = payload.get('building') or payload.get('building_name')
         if name:
-            cost = building_cost(str(name))
-            if cost:
-                amt = 1
-                f, w, g, s = cost
-                return (-f * amt, -w * amt, -g * amt, -s * amt)
+            spend = _spend_for('building', str(name))
+            if spend:
+                return spend
     if tname == 'RESEARCH':
         name = payload.get('technology') or payload.get('tech')
         if name:
-            cost = tech_cost(str(name))
-            if cost:
-                f, w, g, s = cost
-                return (-f, -w, -g, -s)
+            spend = _spend_for('tech', str(name))
+            if spend:
+                return spend
     if tname in ('BUY', 'SELL'):
         res = str(payload.get('resource', '')).lower()
         amt = int(payload.get('amount') or 0)
@@ -361,6 +646,50 @@ def _resource_delta_for_action(act) -> Tuple[int, int, int, int] | None:
     return None
 
 
+def _delta_arrays(match) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Columnar ``(t, pid, delta)`` for actions with a resource delta, built
+    once per match; ``delta`` is ``(n, 4)`` food/wood/gold/stone (read-only).
+    """
+    store = _match_cache(match)
+    hit = store.get('deltas')
+    if hit is not None:
+        return hit
+    rec, _ = _action_records(match)
+    actions = match.actions
+    # typed buffers, viewed as arrays at the end (no list of tuples to convert)
+    kept = array('q')
+    deltas = array('d')
+    for i in _delta_indices(match).tolist():
+        delta = _resource_delta_for_action(actions[i])
+        if not delta:
+            continue
+        kept.append(i)
+        deltas.extend(delta)
+    sel = np.frombuffer(kept, dtype=np.int64)
+    t = rec['t'][sel]
+    pid_arr = rec['pid'][sel]
+    delta_arr = np.frombuffer(deltas, dtype=float).reshape(-1, 4)
+    for arr in (t, pid_arr, delta_arr):
+        arr.flags.writeable = False
+    store['deltas'] = (t, pid_arr, delta_arr)
+    return store['deltas']
+
+
+def _binned_sum(t: np.ndarray, pid: np.ndarray, w: np.ndarray, window_sec: int, cumulative: bool = False, start_at: float = 0.0) -> pd.DataFrame:
+    """Per-player sum of ``w`` per window as a DataFrame (columns=player ids),
+    optionally accumulated over windows and offset by ``start_at``.
+    """
+    bins = np.arange(0, t.max() + window_sec, window_sec)
+    players, sums = _bin_by_player(t, pid, bins, weights=w)
+    if cumulative:
+        sums = np.cumsum(sums, axis=1)
+    if start_at:
+        sums = sums + start_at
+    ts = pd.DataFrame(sums.T, index=bins[:-1], columns=pd.Index(players))
+    ts.index.name = 'time_sec'
+    return ts
+
+
 def resource_spend_timeseries(match, resource: str, window_sec: int) -> pd.DataFrame:
     """Estimated spend per window for a resource based on actions.
 
@@ -372,32 +701,13 @@ def resource_spend_timeseries(match, resource: str, window_sec: int) -> pd.DataF
     if idx is None:
         raise ValueError('Recurso no soportado')
 
-    rows: List[Tuple[float, int, float]] = []
-    for act in match.actions:
-        pid = getattr(getattr(act, 'player', None), 'number', None)
-        if pid is None:
-            continue
-        delta = _resource_delta_for_action(act)
-        if not delta:
-            continue
-        val = float(delta[idx])
-        if val >= 0:
-            # spend is negative; skip non-spend deltas here
-            continue
-        rows.append((act.timestamp.total_seconds(), int(pid), -val))  # store as positive spend
-    if not rows:
+    t, pid, delta = _delta_arrays(match)
+    val = delta[:, idx]
+    # spend is negative; skip non-spend deltas here
+    keep = val < 0
+    if not keep.any():
         return pd.DataFrame()
-    df = pd.DataFrame(rows, columns=['t', 'player', 'w'])
-    max_t = df['t'].max()
-    bins = np.arange(0, max_t + window_sec, window_sec)
-    out: Dict[int, Any] = {}
-    for pid in df['player'].unique():
-        mask = df['player'] == pid
-        sums, _ = np.histogram(df.loc[mask, 't'], bins=bins, weights=df.loc[mask, 'w'])
-        out[int(pid)] = sums.astype(float)
-    ts = pd.DataFrame(out, index=bins[:-1])
-    ts.index.name = 'time_sec'
-    return ts
+    return _binned_sum(t[keep], pid[keep], -val[keep], window_sec)  # as positive spend
 
 
 def resource_balance_timeseries(match, resource: str, window_sec: int, start_at: float = 0.0) -> pd.DataFrame:
@@ -410,66 +720,50 @@ def resource_balance_timeseries(match, resource: str, window_sec: int, start_at:
     idx = {'food': 0, 'wood': 1, 'gold': 2, 'stone': 3}.get(res)
     if idx is None:
         raise ValueError('Recurso no soportado')
-    rows: List[Tuple[float, int, float]] = []
-    for act in match.actions:
-        pid = getattr(getattr(act, 'player', None), 'number', None)
-        if pid is None:
-            continue
-        delta = _resource_delta_for_action(act)
-        if not delta:
-            continue
-        rows.append((act.timestamp.total_seconds(), int(pid), float(delta[idx])))
-    if not rows:
+    t, pid, delta = _delta_arrays(match)
+    if not len(t):
         return pd.DataFrame()
-    df = pd.DataFrame(rows, columns=['t', 'player', 'delta'])
-    max_t = df['t'].max()
-    bins = np.arange(0, max_t + window_sec, window_sec)
-    out: Dict[int, Any] = {}
-    for pid in df['player'].unique():
-        mask = df['player'] == pid
-        sums, _ = np.histogram(df.loc[mask, 't'], bins=bins, weights=df.loc[mask, 'delta'])
-        bal = np.cumsum(sums.astype(float))
-        bal = bal + start_at
-        out[int(pid)] = bal
-    ts = pd.DataFrame(out, index=bins[:-1])
-    ts.index.name = 'time_sec'
-    return ts
+    return _binned_sum(t, pid, delta[:, idx], window_sec, cumulative=True, start_at=start_at)
 
 
-def total_spend_timeseries(match, window_sec: int, cumulative: bool = True) -> pd.DataFrame:
+def total_spend_timeseries(match, window_sec: int, cumulative: bool = True, return_dataframe: bool = False) -> TimeSeries | pd.DataFrame:
     """Total spend across all resources per player per window.
 
     If cumulative=True, returns cumulative sum over windows (monotonic increasing curves).
     """
-    rows: List[Tuple[float, int, float]] = []
-    for act in match.actions:
-        pid = getattr(getattr(act, 'player', None), 'number', None)
-        if pid is None:
-            continue
-        delta = _resource_delta_for_action(act)
-        if not delta:
-            continue
-        # spend is negative across any resource; sum absolute spend
-        spend = sum((-v) for v in delta if v < 0)
-        if spend <= 0:
-            continue
-        rows.append((act.timestamp.total_seconds(), int(pid), float(spend)))
-    if not rows:
-        return pd.DataFrame()
-    df = pd.DataFrame(rows, columns=['t', 'player', 'w'])
-    max_t = df['t'].max()
-    bins = np.arange(0, max_t + window_sec, window_sec)
-    out: Dict[int, Any] = {}
-    for pid in df['player'].unique():
-        mask = df['player'] == pid
-        sums, _ = np.histogram(df.loc[mask, 't'], bins=bins, weights=df.loc[mask, 'w'])
-        series = sums.astype(float)
-        if cumulative:
-            series = np.cumsum(series)
-        out[int(pid)] = series
-    ts = pd.DataFrame(out, index=bins[:-1])
-    ts.index.name = 'time_sec'
-    return ts
+    t, pid, delta = _delta_arrays(match)
+    # spend is negative across any resource; sum absolute spend
+    spend = np.where(delta < 0, -delta, 0.0).sum(axis=1)
+    keep = spend > 0
+    if not keep.any():
+        return _timeseries_result(TimeSeries.empty_series(), return_dataframe)
+    t, pid, spend = t[keep], pid[keep], spend[keep]
+    bins = np.arange(0, t.max() + window_sec, window_sec)
+    players, sums = _bin_by_player(t, pid, bins, weights=spend)
+    if cumulative:
+        sums = np.cumsum(sums, axis=1)
+    ts = TimeSeries(bins[:-1], sums.T, np.asarray(players, dtype=np.int64))
+    return _timeseries_result(ts, return_dataframe)
+
+
+_AGE_TECHS = frozenset({'feudal age', 'castle age', 'imperial age'})
+# Some high-impact techs, matched as substrings of the lowercased name
+_KEY_TECH_RE = re.compile('|'.join(re.escape(k) for k in (
+    'bracer', 'chemistry', 'hand cart', 'wheelbarrow', 'conscription',
+    'ballistics', 'siege engineers', 'architecture', 'thumb ring',
+))).search
+_BUILD_EVENT_KINDS = {'castle': 'castle', 'town center': 'tc'}
+
+
+@lru_cache(maxsize=512)
+def _research_event_kind(lname: str) -> str | None:
+    if lname in _AGE_TECHS:
+        return 'age'
+    if lname.startswith('elite '):
+        return 'elite'
+    if _KEY_TECH_RE(lname):
+        return 'tech'
+    return None
 
 
 def important_events(match) -> pd.DataFrame:
@@ -478,97 +772,118 @@ def important_events(match) -> pd.DataFrame:
     Returns a DataFrame with columns: time_sec, player, label, kind
     kind in {age, castle, elite, tech}
     """
-    rows: List[Tuple[float, int, str, str]] = []
-    for act in match.actions:
-        pid = getattr(getattr(act, 'player', None), 'number', None)
-        if pid is None:
-            continue
-        t = act.timestamp.total_seconds()
-        tname = getattr(getattr(act, 'type', None), 'name', '') or ''
-        payload = getattr(act, 'payload', {}) or {}
-        if tname == 'RESEARCH':
-            tech = str(payload.get('technology') or '')
-            lname = tech.lower()
-            if lname in ('feudal age', 'castle age', 'imperial age'):
-                rows.append((t, int(pid), tech, 'age'))
-            elif lname.startswith('elite '):
-                rows.append((t, int(pid), tech, 'elite'))
-            else:
-                # Mark some high-impact techs
-                hi = {
-                    'bracer', 'chemistry', 'hand cart', 'wheelbarrow', 'conscription',
-                    'ballistics', 'siege engineers', 'architecture', 'thumb ring'
-                }
-                if any(k in lname for k in hi):
-                    rows.append((t, int(pid), tech, 'tech'))
-        elif tname == 'BUILD':
-            b = str(payload.get('building') or '')
-            lb = b.lower()
-            if lb == 'castle':
-                rows.append((t, int(pid), b, 'castle'))
-            if lb == 'town center':
-                rows.append((t, int(pid), b, 'tc'))
-    if not rows:
+    rec, codes = _action_records(match)
+    research = codes.get('RESEARCH', -1)
+    sel = np.flatnonzero(_type_mask(match, ('RESEARCH', 'BUILD')) & (rec['pid'] >= 0))
+    # t/pid/type come from the per-match records; only the payload is read per action
+    actions = match.actions
+    kept: List[int] = []
+    labels: List[str] = []
+    kinds: List[str] = []
+    for i, code in zip(sel.tolist(), rec['tcode'][sel].tolist()):
+        payload = getattr(actions[i], 'payload', {}) or {}
+        if code == research:
+            label = str(payload.get('technology') or '')
+            kind = _research_event_kind(label.lower())
+        else:  # BUILD
+            label = str(payload.get('building') or '')
+            kind = _BUILD_EVENT_KINDS.get(label.lower())
+        if kind is not None:
+            kept.append(i)
+            labels.append(label)
+            kinds.append(kind)
+    if not kept:
         return pd.DataFrame(columns=['time_sec', 'player', 'label', 'kind'])
-    df = pd.DataFrame(rows, columns=['time_sec', 'player', 'label', 'kind'])
+    df = pd.DataFrame({'time_sec': rec['t'][kept], 'player': rec['pid'][kept], 'label': labels, 'kind': kinds})
     df = df.sort_values('time_sec').drop_duplicates(subset=['player','label'], keep='first')
     return df
 
 
-def sync_total_resources_timeseries(path: Path, window_sec: int) -> pd.DataFrame:
-    """Parse sync packets to build per-player total resource stock over time (sum of f+w+g+s).
-
-    Returns DataFrame indexed by window start seconds with columns=player ids.
-    Values are forward-filled snapshots aggregated into bins.
+@lru_cache(maxsize=8)
+def _sync_snapshots(path: str, mtime_ns: int, size: int) -> Tuple[float, Dict[int, Tuple[np.ndarray, np.ndarray]]]:
+    """Walk the sync packets of one file version once: returns the last
+    snapshot time and, per pid, time-sorted (times, total_res) arrays.
+    Independent of the window, so changing it only re-bins.
     """
     import mgz.fast as fast
-    times: List[float] = []
-    per_pid: Dict[int, List[Tuple[float, float]]] = {}
-    with open(path, 'rb') as fh:
-        # Advance to start of body
+    max_t = 0.0
+    # pid -> (times, totals) as growable C double buffers, no per-snapshot tuples
+    per_pid: Dict[int, Tuple[array, array]] = {}
+    fh = open_replay(path)
+    # Advance to start of body
+    try:
+        fast.start(fh)
+    except Exception:
+        pass
+    while True:
         try:
-            fast.start(fh)
+            op_type, payload = fast.operation(fh)
+        except EOFError:
+            break
         except Exception:
-            pass
-        while True:
+            # Skip unknown
+            continue
+        if op_type != fast.Operation.SYNC:
+            continue
+        increment, checksum, pl = payload
+        # Only DE payload has dict of players
+        if not isinstance(pl, dict):
+            continue
+        t_ms = pl.get('current_time')
+        if t_ms is None:
+            continue
+        t = float(t_ms) / 1000.0
+        if t > max_t:
+            max_t = t
+        for k, v in pl.items():
+            if k == 'current_time':
+                continue
             try:
-                op_type, payload = fast.operation(fh)
-            except EOFError:
-                break
+                pid = int(k)
             except Exception:
-                # Skip unknown
                 continue
-            if op_type != fast.Operation.SYNC:
-                continue
-            increment, checksum, pl = payload
-            # Only DE payload has dict of players
-            if not isinstance(pl, dict):
-                continue
-            t_ms = pl.get('current_time')
-            if t_ms is None:
-                continue
-            t = float(t_ms) / 1000.0
-            times.append(t)
-            for k, v in pl.items():
-                if k == 'current_time':
-                    continue
-                try:
-                    pid = int(k)
-                except Exception:
-                    continue
-                total_res = float(v.get('total_res', 0.0)) if isinstance(v, dict) else 0.0
-                per_pid.setdefault(pid, []).append((t, total_res))
+            total_res = float(v.get('total_res', 0.0)) if isinstance(v, dict) else 0.0
+            bufs = per_pid.get(pid)
+            if bufs is None:
+                bufs = per_pid[pid] = (array('d'), array('d'))
+            bufs[0].append(t)
+            bufs[1].append(total_res)
+    out: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    for pid, (t_buf, v_buf) in per_pid.items():
+        t_arr = np.frombuffer(t_buf, dtype=float)
+        order = np.argsort(t_arr, kind='stable')
+        t_arr = t_arr[order]
+        val_arr = np.frombuffer(v_buf, dtype=float)[order]
+        t_arr.flags.writeable = False
+        val_arr.flags.writeable = False
+        out[pid] = (t_arr, val_arr)
+    return max_t, out
+
+
+def sync_total_resources_timeseries(path: Path, window_sec: int) -> pd.DataFrame:
+    """Parse sync packets to build per-player total resource stock over time (sum of f+w+g+s).
+
+    Returns DataFrame indexed by window start seconds with columns=player ids.
+    Values are forward-filled snapshots aggregated into bins.
+    """
+    max_t, per_pid = _sync_snapshots(*file_key(path))
     if not per_pid:
         return pd.DataFrame()
-    max_t = max(times) if times else 0.0
     bins = np.arange(0, max_t + window_sec, window_sec)
     out: Dict[int, Any] = {}
-    for pid, pairs in per_pid.items():
-        pairs.sort(key=lambda x: x[0])
-        t_arr = np.array([t for t, _ in pairs], dtype=float)
-        val_arr = np.array([v for _, v in pairs], dtype=float)
-        s = pd.Series(val_arr, index=t_arr)
-        out[int(pid)] = s.reindex(bins, method='ffill').fillna(method='bfill').fillna(0.0).values[:-1]
+    for pid, (t_arr, val_arr) in per_pid.items():
+        # ffill: last snapshot at or before each bin edge (plain gather on sorted times)
+        idx = np.searchsorted(t_arr, bins, side='right') - 1
+        vals = np.where(idx >= 0, val_arr[np.maximum(idx, 0)], np.nan)
+        # bfill leading gaps from the next filled edge, 0 when nothing follows
+        ok = np.flatnonzero(~np.isnan(vals))
+        if ok.size:
+            nxt = np.minimum(np.searchsorted(ok, np.arange(len(vals))), ok.size - 1)
+            back = np.where(np.arange(len(vals)) <= ok[-1], vals[ok[nxt]], 0.0)
+            vals = np.where(np.isnan(vals), back, vals)
+        else:
+            vals = np.zeros(len(vals))
+        out[int(pid)] = vals[:-1]
     ts = pd.DataFrame(out, index=bins[:-1])
     ts.index.name = 'time_sec'
     return ts
@@ -579,29 +894,19 @@ def approximate_total_balance_timeseries(match, window_sec: int, start_at: Tuple
 
     Returns DataFrame with per-player total balance across resources.
     """
-    # Compute per-resource balances
+    # Per-resource balances share the same delta rows, hence the same bins
+    # and players: bin each resource column and add the balances directly.
     res_names = ['food', 'wood', 'gold', 'stone']
     starts = dict(zip(res_names, start_at))
-    frames = []
-    for r in res_names:
-        try:
-            ts = resource_balance_timeseries(match, resource=r, window_sec=window_sec, start_at=float(starts.get(r, 0)))
-        except Exception:
-            ts = pd.DataFrame()
-        frames.append(ts)
-    # Align by index
-    idx = None
-    for f in frames:
-        if f is not None and not f.empty:
-            idx = f.index if idx is None else idx.union(f.index)
-    if idx is None:
+    t, pid, delta = _delta_arrays(match)
+    if not len(t):
         return pd.DataFrame()
-    total: Dict[int, Any] = {}
-    for f in frames:
-        if f is None or f.empty:
-            continue
-        for col in f.columns:
-            total[col] = total.get(col, 0) + f.reindex(idx).fillna(method='ffill').fillna(0)[col]
-    out = pd.DataFrame(total, index=idx)
+    bins = np.arange(0, t.max() + window_sec, window_sec)
+    total = None
+    for i, r in enumerate(res_names):
+        players, sums = _bin_by_player(t, pid, bins, weights=delta[:, i])
+        bal = np.cumsum(sums, axis=1) + float(starts.get(r, 0))
+        total = bal if total is None else total + bal
+    out = pd.DataFrame(total.T, index=bins[:-1], columns=pd.Index(players))
     out.index.name = 'time_sec'
     return out
@@ -4,30 +4,49 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
+from .downsample import lttb  # re-exported: viz used to define it
+from .metrics import TimeSeries
 
-def plot_apm(ts: pd.DataFrame, match, window_sec: int):
-    if ts.empty:
-        print('Sin acciones suficientes para APM.')
-        return
+
+def _as_frame(ts) -> pd.DataFrame:
+    return ts.to_dataframe() if isinstance(ts, TimeSeries) else ts
+
+
+def _player_names(match) -> dict:
+    return {p.number: p.name for p in match.players}
+
+
+def _plot_lines(ts: pd.DataFrame, match, ylabel: str, title: str):
+    """One line per player column (x in minutes), shared by the time-series plots."""
+    names = _player_names(match)
     plt.figure(figsize=(10, 6))
     for pid in ts.columns:
-        name = next(p.name for p in match.players if p.number == pid)
-        plt.plot(ts.index / 60, ts[pid], label=name)
+        plt.plot(ts.index / 60, ts[pid], label=names[pid])
     plt.xlabel('Tiempo (min)')
-    plt.ylabel('APM')
-    plt.title(f'APM por jugador — ventana {window_sec}s')
+    plt.ylabel(ylabel)
+    plt.title(title)
     plt.grid(True)
     plt.legend()
     plt.show()
 
 
-def plot_apm_bar(ts: pd.DataFrame, match):
+def plot_apm(ts: TimeSeries | pd.DataFrame, match, window_sec: int):
+    ts = _as_frame(ts)
+    if ts.empty:
+        print('Sin acciones suficientes para APM.')
+        return
+    _plot_lines(ts, match, 'APM', f'APM por jugador — ventana {window_sec}s')
+
+
+def plot_apm_bar(ts: TimeSeries | pd.DataFrame, match):
+    ts = _as_frame(ts)
     if ts.empty:
         print('Sin datos para generar barplot de APM.')
         return
     means = ts.mean()
     stds = ts.std()
-    names = [next(p.name for p in match.players if p.number == pid) for pid in means.index]
+    name_by_pid = _player_names(match)
+    names = [name_by_pid[pid] for pid in means.index]
     x = np.arange(len(names))
     plt.figure(figsize=(6, 5))
     plt.bar(x, means.values, yerr=stds.values, capsize=6)
@@ -38,50 +57,26 @@ def plot_apm_bar(ts: pd.DataFrame, match):
     plt.show()
 
 
-def plot_units_created_ts(ts: pd.DataFrame, match, unit_type: str, window_sec: int):
+def plot_units_created_ts(ts: TimeSeries | pd.DataFrame, match, unit_type: str, window_sec: int):
+    ts = _as_frame(ts)
     if ts.empty:
         print(f'Sin acciones suficientes para {unit_type}.')
         return
-    plt.figure(figsize=(10, 6))
-    for pid in ts.columns:
-        name = next(p.name for p in match.players if p.number == pid)
-        plt.plot(ts.index/60, ts[pid], label=name)
-    plt.xlabel('Tiempo (min)')
-    plt.ylabel(f'Unidades creadas ({unit_type})')
-    plt.title(f'{unit_type} creadas por jugador — ventana {window_sec}s')
-    plt.grid(True)
-    plt.legend()
-    plt.show()
+    _plot_lines(ts, match, f'Unidades creadas ({unit_type})', f'{unit_type} creadas por jugador — ventana {window_sec}s')
 
 
-def plot_tc_idle_cumulative(ts: pd.DataFrame, match, window_sec: int):
+def plot_tc_idle_cumulative(ts: TimeSeries | pd.DataFrame, match, window_sec: int):
+    ts = _as_frame(ts)
     if ts.empty:
         print('Sin datos suficientes para idle TC acumulado.')
         return
-    plt.figure(figsize=(10, 6))
-    for pid in ts.columns:
-        name = next(p.name for p in match.players if p.number == pid)
-        plt.plot(ts.index/60, ts[pid], label=name)
-    plt.xlabel('Tiempo (min)')
-    plt.ylabel('Idle TC acumulado (s)')
-    plt.title(f'Idle TC acumulado — ventana {window_sec}s')
-    plt.grid(True)
-    plt.legend()
-    plt.show()
+    _plot_lines(ts, match, 'Idle TC acumulado (s)', f'Idle TC acumulado — ventana {window_sec}s')
 
 
-def plot_resource_cumulative(ts: pd.DataFrame, match, resource: str, window_sec: int):
+def plot_resource_cumulative(ts: TimeSeries | pd.DataFrame, match, resource: str, window_sec: int):
+    ts = _as_frame(ts)
     if ts.empty:
         print('Sin datos suficientes para recursos acumulados.')
         return
-    plt.figure(figsize=(10, 6))
-    for pid in ts.columns:
-        name = next(p.name for p in match.players if p.number == pid)
-        plt.plot(ts.index/60, ts[pid], label=name)
-    plt.xlabel('Tiempo (min)')
-    plt.ylabel(f'{resource.title()} acumulado')
-    plt.title(f'{resource.title()} acumulado — ventana {window_sec}s')
-    plt.grid(True)
-    plt.legend()
-    plt.show()
+    _plot_lines(ts, match, f'{resource.title()} acumulado', f'{resource.title()} acumulado — ventana {window_sec}s')
 
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import re
 import traceback
+from collections import defaultdict
 from pathlib import Path
 
 try:
@@ -10,111 +12,228 @@ try:
         QLabel, QPushButton, QComboBox, QSpinBox, QListWidget, QListWidgetItem, QCheckBox
     )
     from PySide6.QtGui import QAction
+    from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
 except Exception:  # pragma: no cover
     from PyQt5 import QtWidgets  # type: ignore
     from PyQt5.QtWidgets import (  # type: ignore
         QMainWindow, QWidget, QFileDialog, QMessageBox, QTabWidget, QVBoxLayout, QHBoxLayout,
         QLabel, QPushButton, QComboBox, QSpinBox, QListWidget, QListWidgetItem, QCheckBox, QAction
     )
+    from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal as Signal  # type: ignore
 
 import os
 # Ensure Matplotlib uses QtAgg with the chosen Qt binding
 os.environ.setdefault("QT_API", os.environ.get("QT_API", "pyside6"))
 os.environ.setdefault("MPLBACKEND", "QtAgg")
+import matplotlib as mpl
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba, to_rgba_array
 from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+import numpy as np
 
 from aoe2stat.core import load_match
+from aoe2stat.downsample import lttb
 from aoe2stat.metrics import (
     apm_timeseries, unit_created_timeseries, tc_idle_cumulative_timeseries,
     resource_totals_postgame, resource_cumulative_timeseries,
     resource_spend_timeseries, resource_balance_timeseries, important_events,
+    TimeSeries,
 )
 from aoe2stat.patterns import base_unit_patterns, augment_unit_patterns
 
+_VILLAGER_RE = re.compile(r'villager|aldean', re.IGNORECASE)
+_BLACK = np.array([0.0, 0.0, 0.0, 1.0], dtype=np.float32)
+# pyqtgraph (optional GPU line plots), imported only when AOE2STAT_BACKEND=gl
+pg = None
+
+# Interactive plots: simplify dense polylines before rasterizing them
+mpl.rcParams.update({'path.simplify': True, 'path.simplify_threshold': 1.0, 'agg.path.chunksize': 10000})
+
 
 class PlotCanvas(FigureCanvas):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, max_points: int = 2000):
         fig = Figure(figsize=(5, 4), constrained_layout=True)
         self.ax = fig.add_subplot(111)
         super().__init__(fig)
+        # Constrained layout is solved in draw() only when something that can
+        # move the axes changed (size, labels, legend, limits, overlays)
+        self._layout_engine = fig.get_layout_engine()
+        fig.set_layout_engine('none')
+        self._layout_dirty = True
         self.dark = False
         self.legend_outside = False
+        # longer series are LTTB-downsampled to this many points before drawing
+        self.max_points = max_points
+        self._theme_applied = False
+        self._lines: dict = {}
+        self._collection = None
+        self._legend_handles = None
+        self._last_key: tuple | None = None
+        self._legend_state: tuple | None = None
+        # Artists drawn by add_event_markers (plus any marker legend), toggled as a group
+        self.event_artists: list = []
+
+    def draw(self):
+        if self._layout_dirty:
+            self._layout_engine.execute(self.figure)
+            self._layout_dirty = False
+        super().draw()
+
+    def resizeEvent(self, event):
+        self._layout_dirty = True
+        super().resizeEvent(event)
 
     def set_theme(self, dark: bool):
         self.dark = bool(dark)
+        self._theme_applied = False
         # Apply immediately to current axes
         self._apply_theme()
-        self.draw()
+        self.draw_idle()
 
-    def _apply_theme(self):
+    def _theme_colors(self):
         if self.dark:
-            fg = '#e6e6e6'; bg = '#0f1116'; axbg = '#141821'; grid = '#2a2f3a'; spine = '#5a6472'
-        else:
-            fg = '#111111'; bg = '#ffffff'; axbg = '#ffffff'; grid = '#dddddd'; spine = '#444444'
-        self.figure.set_facecolor(bg)
-        self.ax.set_facecolor(axbg)
-        self.ax.grid(True, color=grid, alpha=0.6)
+            return {'fg': '#e6e6e6', 'bg': '#0f1116', 'axbg': '#141821', 'grid': '#2a2f3a', 'spine': '#5a6472'}
+        return {'fg': '#111111', 'bg': '#ffffff', 'axbg': '#ffffff', 'grid': '#dddddd', 'spine': '#444444'}
+
+    def _apply_theme(self):
+        c = self._theme_colors()
+        self.figure.set_facecolor(c['bg'])
+        self.ax.set_facecolor(c['axbg'])
         for spine_obj in self.ax.spines.values():
-            spine_obj.set_color(spine)
-        self.ax.tick_params(colors=fg)
-        self.ax.xaxis.label.set_color(fg); self.ax.yaxis.label.set_color(fg)
-        self.ax.title.set_color(fg)
+            spine_obj.set_color(c['spine'])
+        self._apply_axes_style()
+        self._theme_applied = True
         # adjust legend after theme
         self._apply_legend()
 
+    def _apply_axes_style(self):
+        # ax.clear() keeps facecolors and spines but resets grid, ticks and text colors
+        c = self._theme_colors()
+        self.ax.grid(True, color=c['grid'], alpha=0.6)
+        self.ax.tick_params(colors=c['fg'])
+        self.ax.xaxis.label.set_color(c['fg']); self.ax.yaxis.label.set_color(c['fg'])
+        self.ax.title.set_color(c['fg'])
+
     def set_legend_outside(self, outside: bool):
         self.legend_outside = bool(outside)
         self._apply_legend()
-        self.draw()
+        self.draw_idle()
 
     def _apply_legend(self):
         leg = self.ax.get_legend()
-        if leg is None:
+        if leg is None or self._legend_state == (leg, self.legend_outside, self.dark):
+            # no legend yet, or it already has this placement and frame colors
             return
+        leg.remove()
+        self._make_legend()
+
+    def _make_legend(self):
+        # proxy handles when the series are drawn as one LineCollection
+        kw = {} if self._legend_handles is None else {'handles': self._legend_handles}
         if self.legend_outside:
-            leg.remove()
-            leg = self.ax.legend(loc='center left', bbox_to_anchor=(1.02, 0.5), borderaxespad=0., framealpha=0.2, fontsize=9)
+            leg = self.ax.legend(loc='center left', bbox_to_anchor=(1.02, 0.5), borderaxespad=0., framealpha=0.2, fontsize=9, **kw)
         else:
-            leg.remove()
-            leg = self.ax.legend(loc='upper left', framealpha=0.2, fontsize=9)
+            leg = self.ax.legend(loc='upper left', framealpha=0.2, fontsize=9, **kw)
         if leg is not None and self.dark:
             leg.get_frame().set_facecolor('#0f1116')
             leg.get_frame().set_edgecolor('#5a6472')
+        self._legend_state = (leg, self.legend_outside, self.dark)
+        self._layout_dirty = True
+
+    # Up to this many series go into a single LineCollection (AoE2 has at most 8 players)
+    MAX_COLLECTION_SERIES = 12
+    # Series longer than this (before downsampling) are drawn rasterized
+    RASTERIZE_POINTS = 2000
 
     def plot_lines(self, x, series_dict, xlabel: str, ylabel: str, title: str, colors: dict | None = None):
-        self.ax.clear()
-        ymax = 0.0
-        for label, y in series_dict.items():
-            kw = {}
-            if colors and label in colors:
-                kw['color'] = colors[label]
-            self.ax.plot(x, y, label=label, linewidth=1.8, **kw)
-            try:
-                ymax = max(ymax, float(max(y)))
-            except Exception:
-                pass
-        self.ax.set_xlabel(xlabel)
-        self.ax.set_ylabel(ylabel)
-        self.ax.set_title(title)
-        self._apply_theme()
-        leg = self.ax.legend(loc='upper left', framealpha=0.2, fontsize=9)
-        if leg is not None and self.dark:
-            leg.get_frame().set_facecolor('#0f1116')
-            leg.get_frame().set_edgecolor('#5a6472')
-        # re-apply legend placement (inside/outside)
-        self._apply_legend()
+        labels = tuple(series_dict.keys())
+        key = (labels, tuple((colors or {}).get(label) for label in labels), xlabel, ylabel, title)
+        limits = (self.ax.get_xlim(), self.ax.get_ylim())
+        if len(x) > self.max_points:
+            points = [lttb(x, y, self.max_points) for y in series_dict.values()]
+        else:
+            points = [(x, y) for y in series_dict.values()]
+        if labels and key == self._last_key and not self.has_overlays():
+            # Same lines as last time: update their data instead of rebuilding the axes
+            if self._collection is not None:
+                segments = [np.column_stack(xy) for xy in points]
+                self._collection.set_segments(segments)
+                # relim() ignores collections, so reset the data limits by hand
+                self.ax.ignore_existing_data_limits = True
+                self.ax.update_datalim(np.concatenate(segments))
+            else:
+                for label, xy in zip(labels, points):
+                    self._lines[label].set_data(*xy)
+                self.ax.relim()
+            self.ax.autoscale(enable=True)
+        else:
+            self.ax.clear()
+            self._layout_dirty = True
+            self._lines = {}
+            self._collection = None
+            self._legend_handles = None
+            self.event_artists = []
+            line_colors = self._line_colors(labels, colors)
+            rasterized = len(x) > self.RASTERIZE_POINTS
+            if 0 < len(labels) <= self.MAX_COLLECTION_SERIES:
+                self._collection = LineCollection(
+                    [np.column_stack(xy) for xy in points], colors=line_colors,
+                    linewidths=1.8, joinstyle='round', capstyle='projecting', rasterized=rasterized)
+                self.ax.add_collection(self._collection)
+                self.ax.autoscale_view()
+                self._legend_handles = [Line2D([], [], color=c, linewidth=1.8, label=label)
+                                        for label, c in zip(labels, line_colors)]
+            else:
+                for label, xy, c in zip(labels, points, line_colors):
+                    self._lines[label], = self.ax.plot(*xy, label=label, color=c, linewidth=1.8, rasterized=rasterized)
+            self.ax.set_xlabel(xlabel)
+            self.ax.set_ylabel(ylabel)
+            self.ax.set_title(title)
+            if self._theme_applied:
+                self._apply_axes_style()
+            else:
+                self._apply_theme()
+            # legend placement (inside/outside) follows the current setting
+            self._make_legend()
+            self._last_key = key
+        ymax = max([0.0] + [float(np.nanmax(y)) for y in series_dict.values() if len(y)])
         # Add headroom for markers
         if ymax > 0:
             lo, hi = self.ax.get_ylim()
             self.ax.set_ylim(lo, max(hi, ymax * 1.15))
-        self.draw()
+        if (self.ax.get_xlim(), self.ax.get_ylim()) != limits:
+            # tick labels may change width
+            self._layout_dirty = True
+        self.draw_idle()
+
+    @staticmethod
+    def _line_colors(labels, colors):
+        # Same as ax.plot: missing colors take the next color of the property cycle
+        cycle = mpl.rcParams['axes.prop_cycle'].by_key().get('color', ['C0'])
+        out, n = [], 0
+        for label in labels:
+            c = (colors or {}).get(label)
+            if c is None:
+                c = cycle[n % len(cycle)]
+                n += 1
+            out.append(c)
+        return out
+
+    def has_overlays(self):
+        # Event markers, extra legends or messages drawn besides the plotted lines
+        own = 0 if self._collection is None else 1
+        return (len(self.ax.lines) != len(self._lines) or len(self.ax.collections) != own
+                or bool(self.ax.texts) or bool(self.ax.artists))
 
     def draw_message(self, text: str):
         self.ax.clear()
+        self._layout_dirty = True
+        self.event_artists = []
         self.ax.text(0.5, 0.5, text, ha='center', va='center', transform=self.ax.transAxes)
         self.ax.set_axis_off()
-        self.draw()
+        self.draw_idle()
 
     def add_event_markers(self, xs, kinds, colors=None, texts=None):
         # draw vertical lines and marker shapes near top
@@ -127,20 +246,266 @@ class PlotCanvas(FigureCanvas):
             'tech': ('^', 'T'),     # triangle up
             'tc': ('v', 'TC'),      # triangle down
         }
+        # one vlines/scatter call per kind, texts still go point by point
+        grouped = defaultdict(lambda: {'x': [], 'c': []})
+        artists = []
+        txt_color = '#e6e6e6' if self.dark else '#111111'
         for i, (x, kind) in enumerate(zip(xs, kinds)):
-            c = colors[i] if colors and i < len(colors) else 'k'
-            m, txt = marker_map.get(kind, ('o', '?'))
+            c = (colors[i] if colors and i < len(colors) else None) or 'k'
+            grouped[kind]['x'].append(x)
+            grouped[kind]['c'].append(c)
+            txt = marker_map.get(kind, ('o', '?'))[1]
             if texts and i < len(texts) and texts[i]:
                 txt = texts[i]
-            # vertical line
-            self.ax.axvline(x, color=c, linewidth=0.6, alpha=0.4)
-            # marker (filled for visibility)
-            edge = '#ffffff' if self.dark else '#000000'
-            self.ax.scatter([x], [y_pos], marker=m, s=90, facecolors=c, edgecolors=edge, linewidths=0.8, alpha=0.7, clip_on=False)
             # tiny label above in contrasting color
-            txt_color = '#e6e6e6' if self.dark else '#111111'
-            self.ax.text(x, y_pos, txt, va='bottom', ha='center', fontsize=8, color=txt_color)
+            artists.append(self.ax.text(x, y_pos, txt, va='bottom', ha='center', fontsize=8, color=txt_color))
+        edge = '#ffffff' if self.dark else '#000000'
+        for kind, data in grouped.items():
+            m = marker_map.get(kind, ('o', '?'))[0]
+            # vertical lines across the current y range
+            artists.append(self.ax.vlines(data['x'], ylim[0], ylim[1], colors=data['c'], linewidths=0.6, alpha=0.4))
+            # markers (filled for visibility)
+            artists.append(self.ax.scatter(data['x'], [y_pos] * len(data['x']), marker=m, s=90, facecolors=data['c'],
+                                           edgecolors=edge, linewidths=0.8, alpha=0.7, clip_on=False))
         self.ax.set_ylim(ylim)
+        self.event_artists.extend(artists)
+        self._layout_dirty = True
+        return artists
+
+    def set_events_visible(self, visible: bool) -> bool:
+        """Show/hide the event overlay in place; False if there is none to toggle."""
+        if not self.event_artists:
+            return False
+        for artist in self.event_artists:
+            artist.set_visible(visible)
+        self._layout_dirty = True
+        self.draw_idle()
+        return True
+
+
+class PlotCanvasPG(QWidget):
+    """pyqtgraph canvas with the PlotCanvas interface MainWindow uses for line tabs.
+
+    Curves are kept per label and updated with setData; with OpenGL enabled
+    they are drawn on the GPU. Selected with ``AOE2STAT_BACKEND=gl``.
+    """
+
+    # matplotlib marker -> pyqtgraph symbol
+    _SYMBOLS = {'*': 'star', 's': 's', 'D': 'd', '^': 't1', 'v': 't', 'o': 'o'}
+    _theme_colors = PlotCanvas._theme_colors
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.view = pg.GraphicsLayoutWidget()
+        self.view.useOpenGL(True)
+        layout.addWidget(self.view)
+        self.plot = self.view.addPlot(row=0, col=0)
+        self.plot.showGrid(x=True, y=True, alpha=0.6)
+        # pyqtgraph's own decimation: min/max per pixel over the visible range
+        self.plot.setDownsampling(auto=True, mode='peak')
+        self.plot.setClipToView(True)
+        self.legend = None
+        self.dark = False
+        self.legend_outside = False
+        self._curves: dict = {}
+        self._last_key: tuple | None = None
+        self._message = None
+        self.event_artists: list = []
+        self._place_legend()
+        self._apply_theme()
+
+    def set_theme(self, dark: bool):
+        self.dark = bool(dark)
+        self._apply_theme()
+
+    def _apply_theme(self):
+        c = self._theme_colors()
+        self.view.setBackground(c['bg'])
+        self.plot.getViewBox().setBackgroundColor(c['axbg'])
+        for name in ('left', 'bottom'):
+            axis = self.plot.getAxis(name)
+            axis.setPen(c['spine'])
+            axis.setTextPen(c['fg'])
+        self.plot.titleLabel.setText(self.plot.titleLabel.text, color=c['fg'])
+        self._style_legend()
+        if self._message is not None:
+            self._message.setColor(c['fg'])
+
+    def set_legend_outside(self, outside: bool):
+        if bool(outside) != self.legend_outside:
+            self.legend_outside = bool(outside)
+            self._place_legend()
+
+    def _place_legend(self):
+        # A LegendItem with an offset anchors itself to its parent, so an
+        # outside legend is a new, unanchored item in its own layout column
+        if self.legend is not None:
+            if self.legend in self.view.ci.items:
+                self.view.ci.removeItem(self.legend)
+            else:
+                self.plot.scene().removeItem(self.legend)
+        self.legend = pg.LegendItem(offset=None if self.legend_outside else (10, 10))
+        if self.legend_outside:
+            self.legend.setSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+            self.view.addItem(self.legend, row=0, col=1)
+            self.view.ci.layout.setAlignment(self.legend, pg.QtCore.Qt.AlignVCenter)
+        else:
+            self.legend.setParentItem(self.plot.getViewBox())
+        for label, curve in self._curves.items():
+            self.legend.addItem(curve, label)
+        self._style_legend()
+
+    def _style_legend(self):
+        c = self._theme_colors()
+        self.legend.setBrush(pg.mkBrush(_pg_color(c['bg'], 0.2)))
+        self.legend.setPen(c['spine'] if self.dark else None)
+        self.legend.setLabelTextColor(c['fg'])
+
+    def plot_lines(self, x, series_dict, xlabel: str, ylabel: str, title: str, colors: dict | None = None):
+        labels = tuple(series_dict.keys())
+        # curves are reused while labels and colors stay the same
+        key = (labels, tuple((colors or {}).get(label) for label in labels))
+        if key != self._last_key or self.has_overlays():
+            self._clear()
+            for label, c in zip(labels, PlotCanvas._line_colors(labels, colors)):
+                self._curves[label] = self.plot.plot(pen=pg.mkPen(_pg_color(c), width=1.8))
+                self.legend.addItem(self._curves[label], label)
+            self._last_key = key
+        self.plot.setLabel('bottom', xlabel)
+        self.plot.setLabel('left', ylabel)
+        self.plot.setTitle(title, color=self._theme_colors()['fg'])
+        x = np.asarray(x, dtype=float)
+        for label, y in series_dict.items():
+            self._curves[label].setData(x, np.asarray(y, dtype=float))
+        self.plot.enableAutoRange()
+        ys = [np.asarray(y, dtype=float) for y in series_dict.values() if len(y)]
+        ymax = max([0.0] + [float(np.nanmax(y)) for y in ys])
+        # Add headroom for markers
+        if ymax > 0:
+            ymin = min(float(np.nanmin(y)) for y in ys)
+            self.plot.setYRange(ymin, ymax * 1.15)
+
+    def _clear(self):
+        self.plot.clear()
+        self.legend.clear()
+        self._curves = {}
+        self._last_key = None
+        self._message = None
+        self.event_artists = []
+        self.plot.showAxis('left')
+        self.plot.showAxis('bottom')
+
+    def has_overlays(self):
+        return bool(self.event_artists) or self._message is not None
+
+    def draw_message(self, text: str):
+        self._clear()
+        self.plot.setTitle('')
+        self.plot.hideAxis('left')
+        self.plot.hideAxis('bottom')
+        self._message = pg.TextItem(text, color=self._theme_colors()['fg'], anchor=(0.5, 0.5))
+        self.plot.addItem(self._message)
+        self._message.setPos(0.5, 0.5)
+        self.plot.setRange(xRange=(0, 1), yRange=(0, 1), padding=0)
+
+    def add_event_markers(self, xs, kinds, colors=None, texts=None):
+        lo, hi = self.plot.viewRange()[1]
+        y_pos = lo + 0.95 * (hi - lo)
+        marker_map = {
+            'age': ('*', 'F'),
+            'castle': ('s', 'C'),
+            'elite': ('D', 'E'),
+            'tech': ('^', 'T'),
+            'tc': ('v', 'TC'),
+        }
+        grouped = defaultdict(lambda: {'x': [], 'c': []})
+        artists = []
+        txt_color = '#e6e6e6' if self.dark else '#111111'
+        for i, (x, kind) in enumerate(zip(xs, kinds)):
+            c = (colors[i] if colors and i < len(colors) else None) or 'k'
+            grouped[kind]['x'].append(x)
+            grouped[kind]['c'].append(c)
+            txt = marker_map.get(kind, ('o', '?'))[1]
+            if texts and i < len(texts) and texts[i]:
+                txt = texts[i]
+            label = pg.TextItem(txt, color=txt_color, anchor=(0.5, 1.0))
+            label.setPos(x, y_pos)
+            artists.append(label)
+            artists.append(pg.InfiniteLine(pos=x, angle=90, pen=pg.mkPen(_pg_color(c, 0.4), width=0.6)))
+        edge = pg.mkPen('#ffffff' if self.dark else '#000000', width=0.8)
+        for kind, data in grouped.items():
+            symbol = self._SYMBOLS[marker_map.get(kind, ('o', '?'))[0]]
+            artists.append(pg.ScatterPlotItem(data['x'], [y_pos] * len(data['x']), symbol=symbol, size=12, pen=edge,
+                                              brush=[pg.mkBrush(_pg_color(c, 0.7)) for c in data['c']]))
+        for artist in artists:
+            # like matplotlib, only the markers widen the x range
+            self.plot.addItem(artist, ignoreBounds=not isinstance(artist, pg.ScatterPlotItem))
+        self.plot.setYRange(lo, hi, padding=0)
+        self.event_artists.extend(artists)
+        return artists
+
+    def set_events_visible(self, visible: bool) -> bool:
+        """Show/hide the event overlay in place; False if there is none to toggle."""
+        if not self.event_artists:
+            return False
+        for artist in self.event_artists:
+            artist.setVisible(visible)
+        return True
+
+
+def _pg_color(c, alpha: float | None = None):
+    # matplotlib color spec (name, hex, 0-1 RGBA) -> pyqtgraph 0-255 RGBA
+    rgba = to_rgba(c, alpha)
+    return tuple(int(round(v * 255)) for v in rgba)
+
+
+def _import_pyqtgraph() -> bool:
+    global pg
+    if pg is None:
+        try:
+            import pyqtgraph
+        except Exception:
+            return False
+        pg = pyqtgraph
+    return True
+
+
+def _line_canvas():
+    """Canvas for the dense line tabs: pyqtgraph with AOE2STAT_BACKEND=gl when installed."""
+    if os.environ.get('AOE2STAT_BACKEND', '').lower() == 'gl' and _import_pyqtgraph():
+        return PlotCanvasPG()
+    return PlotCanvas()
+
+
+class _WorkerSignals(QObject):
+    finished = Signal(str, int, object)
+    failed = Signal(str, int, str)
+
+
+class MetricWorker(QRunnable):
+    """Runs one plot's metric computation on the thread pool.
+
+    The result comes back through ``signals.finished`` as ``(name, token,
+    result)`` on the GUI thread; errors through ``signals.failed`` with the
+    formatted message and traceback.
+    """
+
+    def __init__(self, name: str, token: int, fn):
+        super().__init__()
+        self.name = name
+        self.token = token
+        self.fn = fn
+        self.signals = _WorkerSignals()
+
+    def run(self):
+        try:
+            result = self.fn()
+        except Exception as e:
+            self.signals.failed.emit(self.name, self.token, f"{e}\n\n{traceback.format_exc()}")
+            return
+        self.signals.finished.emit(self.name, self.token, result)
 
 
 class MainWindow(QMainWindow):
@@ -149,6 +514,21 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("AoE2 Stat Analyzer")
         self.replay_path: Path | None = None
         self.match = None
+        self._pid_to_name: dict = {}
+        self._name_to_color: dict = {}
+        self._rgba_by_pid: dict = {}
+        # Single-shot timers that coalesce bursts of widget signals per plot
+        self._update_timers: dict = {}
+        # Metric results for the current replay, keyed by (function, args)
+        self._metric_cache: dict = {}
+        # id(index) -> (index, x axis in minutes) for the cached results
+        self._x_minutes: dict = {}
+        # Latest request token per plot and the workers still running
+        self._tokens: dict = {}
+        self._renders: dict = {}
+        self._running: dict = {}
+        # Player ids selected in the units filter, kept in sync with the list
+        self._sel_pids: set = set()
         self.unit_patterns = augment_unit_patterns(base_unit_patterns())
 
         self.tabs = QTabWidget()
@@ -163,12 +543,17 @@ class MainWindow(QMainWindow):
         self.tab_score = QWidget(); self.tabs.addTab(self.tab_score, "Score")
 
         self._setup_menu()
-        self._setup_apm_tab()
-        self._setup_units_tab()
-        self._setup_idle_tab()
-        self._setup_res_tab()
-        self._setup_stock_tab()
-        self._setup_score_tab()
+        # Tab contents (and their canvases) are built on first activation
+        self._tab_setup = {
+            self.tab_apm: self._setup_apm_tab,
+            self.tab_units: self._setup_units_tab,
+            self.tab_idle: self._setup_idle_tab,
+            self.tab_res: self._setup_res_tab,
+            self.tab_stock: self._setup_stock_tab,
+            self.tab_score: self._setup_score_tab,
+        }
+        self._tab_ready: set = set()
+        self._ensure_tab(self.tabs.currentWidget())
         self.tabs.currentChanged.connect(self._on_tab_changed)
         # initialize theme/legend on canvases
         self._apply_theme_all()
@@ -199,154 +584,268 @@ class MainWindow(QMainWindow):
         controls = QHBoxLayout(); layout.addLayout(controls)
         controls.addWidget(QLabel("Ventana (s):"))
         self.apm_window = QComboBox(); self.apm_window.addItems(["15","30","45","60","90","120"]) ; self.apm_window.setCurrentText("60")
-        self.apm_window.currentTextChanged.connect(self.update_apm)
+        self.apm_window.currentTextChanged.connect(self._schedule('apm'))
         controls.addWidget(self.apm_window)
-        self.apm_canvas = PlotCanvas(); layout.addWidget(self.apm_canvas)
+        self.apm_canvas = _line_canvas(); layout.addWidget(self.apm_canvas)
 
     def _setup_units_tab(self):
         layout = QVBoxLayout(); self.tab_units.setLayout(layout)
         controls1 = QHBoxLayout(); layout.addLayout(controls1)
         controls1.addWidget(QLabel("Unidad:"))
         self.units_combo = QComboBox(); self.units_combo.addItems(list(self.unit_patterns.keys()))
-        self.units_combo.currentTextChanged.connect(self.update_units)
+        self.units_combo.currentTextChanged.connect(self._schedule('units'))
         controls1.addWidget(self.units_combo)
         controls1.addWidget(QLabel("Ventana (s):"))
         self.units_window = QComboBox(); self.units_window.addItems(["15","30","45","60","90","120"]) ; self.units_window.setCurrentText("60")
-        self.units_window.currentTextChanged.connect(self.update_units)
+        self.units_window.currentTextChanged.connect(self._schedule('units'))
         controls1.addWidget(self.units_window)
         # Player filters
         self.units_players_list = QListWidget(); self.units_players_list.setSelectionMode(QListWidget.MultiSelection)
         layout.addWidget(QLabel("Jugadores a mostrar:"))
         layout.addWidget(self.units_players_list)
-        self.units_players_list.itemSelectionChanged.connect(self.update_units)
-        self.units_canvas = PlotCanvas(); layout.addWidget(self.units_canvas)
+        self.units_players_list.itemSelectionChanged.connect(self._refresh_selected_players)
+        self.units_players_list.itemSelectionChanged.connect(self._schedule('units'))
+        self.units_canvas = _line_canvas(); layout.addWidget(self.units_canvas)
+        if self.match:
+            self._populate_players_list()
 
     def _setup_idle_tab(self):
         layout = QVBoxLayout(); self.tab_idle.setLayout(layout)
         controls = QHBoxLayout(); layout.addLayout(controls)
         controls.addWidget(QLabel("Ventana (s):"))
         self.idle_window = QComboBox(); self.idle_window.addItems(["15","30","45","60","90","120"]) ; self.idle_window.setCurrentText("60")
-        self.idle_window.currentTextChanged.connect(self.update_idle)
+        self.idle_window.currentTextChanged.connect(self._schedule('idle'))
         self.idle_events = QCheckBox("Eventos"); self.idle_events.setChecked(True)
-        self.idle_events.stateChanged.connect(self.update_idle)
+        self.idle_events.stateChanged.connect(lambda *_: self._toggle_events('idle'))
         controls.addWidget(self.idle_events)
-        self.idle_canvas = PlotCanvas(); layout.addWidget(self.idle_canvas)
+        self.idle_canvas = _line_canvas(); layout.addWidget(self.idle_canvas)
 
     def _setup_res_tab(self):
         layout = QVBoxLayout(); self.tab_res.setLayout(layout)
         controls = QHBoxLayout(); layout.addLayout(controls)
         controls.addWidget(QLabel("Recurso:"))
-        self.res_combo = QComboBox(); self.res_combo.addItems(["food","wood","gold","stone"]) ; self.res_combo.currentTextChanged.connect(self.update_res)
+        self.res_combo = QComboBox(); self.res_combo.addItems(["food","wood","gold","stone"]) ; self.res_combo.currentTextChanged.connect(self._schedule('res'))
         controls.addWidget(self.res_combo)
         controls.addWidget(QLabel("Modo:"))
         self.res_mode = QComboBox(); self.res_mode.addItems(["Gasto", "Balance aprox.", "Stock (sync)", "Postgame (si existe)"]) ; self.res_mode.setCurrentText("Gasto")
-        self.res_mode.currentTextChanged.connect(self.update_res)
+        self.res_mode.currentTextChanged.connect(self._schedule('res'))
         # Initial stock for Balance aprox.
         controls.addWidget(QLabel("Stock inicial:"))
         self.res_stock = QSpinBox(); self.res_stock.setRange(0, 100000); self.res_stock.setValue(0)
-        self.res_stock.valueChanged.connect(self.update_res)
+        self.res_stock.valueChanged.connect(self._schedule('res'))
         controls.addWidget(self.res_stock)
         # Toggle significant events
         self.res_events = QCheckBox("Eventos importantes"); self.res_events.setChecked(True)
-        self.res_events.stateChanged.connect(self.update_res)
+        self.res_events.stateChanged.connect(lambda *_: self._toggle_events('res'))
         controls.addWidget(self.res_events)
         controls.addWidget(QLabel("Ventana (s):"))
         self.res_window = QComboBox(); self.res_window.addItems(["15","30","45","60","90","120"]) ; self.res_window.setCurrentText("60")
-        self.res_window.currentTextChanged.connect(self.update_res)
+        self.res_window.currentTextChanged.connect(self._schedule('res'))
         self.res_canvas = PlotCanvas(); layout.addWidget(self.res_canvas)
 
     def _setup_stock_tab(self):
         layout = QVBoxLayout(); self.tab_stock.setLayout(layout)
         self.stock_canvas = PlotCanvas(); layout.addWidget(self.stock_canvas)
 
+    def _schedule(self, name: str):
+        timer = self._update_timers.get(name)
+        if timer is None:
+            timer = QTimer(self)
+            timer.setSingleShot(True)
+            timer.setInterval(100)
+            timer.timeout.connect(getattr(self, f'update_{name}'))
+            self._update_timers[name] = timer
+        return lambda *_: timer.start()
+
     # ---- Actions ----
     def open_replay(self):
         path, _ = QFileDialog.getOpenFileName(self, "Selecciona .aoe2record", filter="AoE2 Replay (*.aoe2record)")
         if not path:
             return
         try:
+            # Fresh dicts (not clear()) so workers still running for the
+            # previous replay store their results out of the way
             self.match = load_match(path)
             self.replay_path = Path(path)
-            # Populate players list
-            self.units_players_list.clear()
-            for p in self.match.players:
-                item = QListWidgetItem(p.name)
-                item.setData(1, int(p.number))
-                item.setSelected(True)
-                self.units_players_list.addItem(item)
-            # Trigger updates
+            self._metric_cache = {}
+            self._x_minutes.clear()
+            self._index_players()
+            if self.tab_units in self._tab_ready:
+                self._populate_players_list()
+            # Trigger updates (tabs not built yet update on first activation)
             self._apply_theme_all()
             self.update_apm(); self.update_units(); self.update_idle(); self.update_res(); self.update_stock(); self.update_score()
         except Exception as e:  # pragma: no cover
             QMessageBox.critical(self, "Error", f"No se pudo abrir el replay:\n{e}\n\n{traceback.format_exc()}")
 
+    def _populate_players_list(self):
+        self.units_players_list.clear()
+        for p in self.match.players:
+            item = QListWidgetItem(p.name)
+            item.setData(1, int(p.number))
+            item.setSelected(True)
+            self.units_players_list.addItem(item)
+        self._refresh_selected_players()
+
+    def _refresh_selected_players(self):
+        self._sel_pids = {int(item.data(1)) for item in self.units_players_list.selectedItems()}
+
+    def _event_marker_data(self, match):
+        # Marker x/kind/player/text for every important event, in event order
+        ev = important_events(match)
+        if ev.empty:
+            empty = np.array([], dtype=object)
+            return np.array([]), empty, np.array([], dtype=int), empty
+        kinds = ev['kind'].to_numpy(dtype=object)
+        label = ev['label'].astype(str).str.lower()
+        age = kinds == 'age'
+        texts = np.select(
+            [age & label.str.contains('feudal', regex=False).to_numpy(),
+             age & label.str.contains('castle', regex=False).to_numpy(),
+             age & label.str.contains('imperial', regex=False).to_numpy(),
+             age, kinds == 'castle', kinds == 'elite', kinds == 'tech', kinds == 'tc'],
+            ['F', 'C', 'I', 'A', 'C', 'E', 'T', 'TC'], default='').astype(object)
+        xs = ev['time_sec'].to_numpy(dtype=float) / 60.0
+        return xs, kinds, ev['player'].to_numpy(dtype=int), texts
+
+    def _event_markers(self, replay, kinds: tuple):
+        xs, all_kinds, pids, texts = self._cached(replay, self._event_marker_data)
+        keep = np.isin(all_kinds, kinds)
+        return xs[keep].tolist(), all_kinds[keep].tolist(), pids[keep].tolist(), texts[keep].tolist()
+
+    def _marker_colors(self, pids):
+        # Player colors are GUI state: resolved at render time, not on the worker
+        return [self._rgba_by_pid.get(pid, _BLACK).tolist() for pid in pids]
+
+    def _toggle_events(self, name: str):
+        # Flip the existing overlay when the plot on screen is current; otherwise
+        # (no markers drawn yet, or a recompute in flight) do a full update
+        checkbox = getattr(self, f'{name}_events')
+        canvas = getattr(self, f'{name}_canvas')
+        if name in self._renders or not canvas.set_events_visible(checkbox.isChecked()):
+            self._schedule(name)()
+
     # ---- Update plots ----
+    def _replay(self):
+        # Taken on the GUI thread when a plot update is submitted; workers only
+        # see this snapshot, never the self.* that open_replay reassigns
+        return self.match, self.replay_path, self._metric_cache
+
+    def _cached(self, replay, fn, *args, **kwargs):
+        match, _, cache = replay
+        key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+        if key not in cache:
+            cache[key] = fn(match, *args, **kwargs)
+        return cache[key]
+
+    def _submit(self, name: str, compute, render):
+        """Run *compute* on the thread pool and *render* its result here.
+
+        Only the latest request per plot is rendered; results of superseded
+        requests are dropped when they arrive.
+        """
+        token = self._tokens.get(name, 0) + 1
+        self._tokens[name] = token
+        self._renders[name] = render
+        worker = MetricWorker(name, token, compute)
+        worker.signals.finished.connect(self._on_metric_ready)
+        worker.signals.failed.connect(self._on_metric_failed)
+        self._running[(name, token)] = worker
+        QThreadPool.globalInstance().start(worker)
+
+    def _on_metric_ready(self, name: str, token: int, result):
+        self._running.pop((name, token), None)
+        if token != self._tokens.get(name):
+            return
+        self._renders.pop(name)(result)
+
+    def _on_metric_failed(self, name: str, token: int, message: str):
+        self._running.pop((name, token), None)
+        if token == self._tokens.get(name):
+            self._renders.pop(name, None)
+            QMessageBox.critical(self, "Error", f"No se pudo calcular la gráfica:\n{message}")
+
+    def _series_from_ts(self, ts):
+        # x in minutes plus one array per player, sliced from a single 2-D view
+        if isinstance(ts, TimeSeries):
+            arr, cols, index = ts.values, ts.players, ts.index
+        else:
+            arr, cols, index = ts.to_numpy(), ts.columns.to_numpy(), ts.index
+        return self._minutes(index), {self._pid_to_name[int(pid)]: arr[:, i] for i, pid in enumerate(cols)}
+
+    def _minutes(self, index):
+        # Cached results (and their player subsets) share the index object
+        hit = self._x_minutes.get(id(index))
+        if hit is None or hit[0] is not index:
+            hit = self._x_minutes[id(index)] = (index, np.asarray(index) / 60)
+        return hit[1]
+
+    def _unit_timeseries(self, match, unit_name: str, window_sec: int):
+        return unit_created_timeseries(match, self.unit_patterns[unit_name], window_sec=window_sec)
+
+    def _sync_timeseries(self, match, path: Path, window_sec: int):
+        from aoe2stat.metrics import sync_total_resources_timeseries
+        return sync_total_resources_timeseries(path, window_sec=window_sec)
+
+    def _postgame_timeseries(self, match, path: Path, resource: str, window_sec: int):
+        # resource_totals_postgame memoises per file, so every resource/window shares one read
+        per_player = resource_totals_postgame(path)
+        try:
+            return resource_cumulative_timeseries(match, per_player, resource=resource, window_sec=window_sec, return_dataframe=True)
+        except Exception:
+            return None
+
     def update_apm(self):
-        if not self.match:
+        if not self.match or self.tab_apm not in self._tab_ready:
             return
         w = int(self.apm_window.currentText())
-        ts = apm_timeseries(self.match, window_sec=w)
-        series = {next(p.name for p in self.match.players if p.number == pid): ts[pid].values for pid in ts.columns}
-        colors = self._player_color_map()
-        self.apm_canvas.plot_lines(ts.index/60, series, 'Tiempo (min)', 'APM', f'APM ventana {w}s', colors)
 
-    def _selected_players(self):
-        pids = []
-        for i in range(self.units_players_list.count()):
-            item = self.units_players_list.item(i)
-            if item.isSelected():
-                pids.append(int(item.data(1)))
-        return pids
+        def render(ts):
+            x, series = self._series_from_ts(ts)
+            colors = self._player_color_map()
+            self.apm_canvas.plot_lines(x, series, 'Tiempo (min)', 'APM', f'APM ventana {w}s', colors)
+        replay = self._replay()
+        self._submit('apm', lambda: self._cached(replay, apm_timeseries, window_sec=w), render)
 
     def update_units(self):
-        if not self.match:
+        if not self.match or self.tab_units not in self._tab_ready:
             return
         unit_name = self.units_combo.currentText()
         w = int(self.units_window.currentText())
-        pattern = self.unit_patterns[unit_name]
-        ts = unit_created_timeseries(self.match, pattern, window_sec=w)
-        sel = self._selected_players()
-        if sel and not ts.empty:
-            ts = ts[[pid for pid in ts.columns if pid in sel]]
-        series = {next(p.name for p in self.match.players if p.number == pid): ts[pid].values for pid in ts.columns}
-        colors = self._player_color_map()
-        self.units_canvas.plot_lines(ts.index/60, series, 'Tiempo (min)', f'Unidades creadas ({unit_name})', f'{unit_name} — ventana {w}s', colors)
+        sel = set(self._sel_pids)
+
+        def render(ts):
+            if sel and not ts.empty:
+                ts = ts.select(sel)
+            x, series = self._series_from_ts(ts)
+            colors = self._player_color_map()
+            self.units_canvas.plot_lines(x, series, 'Tiempo (min)', f'Unidades creadas ({unit_name})', f'{unit_name} — ventana {w}s', colors)
+        replay = self._replay()
+        self._submit('units', lambda: self._cached(replay, self._unit_timeseries, unit_name, window_sec=w), render)
 
     def update_idle(self):
-        if not self.match:
+        if not self.match or self.tab_idle not in self._tab_ready:
             return
-        import re
-        villager_re = re.compile(r'villager|aldean', re.IGNORECASE)
         w = int(self.idle_window.currentText())
-        ts = tc_idle_cumulative_timeseries(self.match, villager_re, window_sec=w)
-        series = {next(p.name for p in self.match.players if p.number == pid): ts[pid].values for pid in ts.columns}
-        colors = self._player_color_map()
-        self.idle_canvas.plot_lines(ts.index/60, series, 'Tiempo (min)', 'Idle TC acumulado (s)', f'Idle TC — ventana {w}s', colors)
-        if self.idle_events.isChecked():
-            ev = important_events(self.match)
-            if not ev.empty:
-                ev = ev[ev['kind'].isin(['tc','age'])]
-                if not ev.empty:
-                    xs = []
-                    kinds = []
-                    cols = []
-                    texts = []
-                    col_map = {p.number: colors.get(p.name, 'k') for p in self.match.players}
-                    for _, row in ev.iterrows():
-                        xs.append(float(row['time_sec'])/60.0)
-                        kinds.append(row['kind'])
-                        cols.append(col_map.get(int(row['player']), 'k'))
-                        if row['kind'] == 'age':
-                            ll = str(row['label']).lower()
-                            texts.append('F' if 'feudal' in ll else ('C' if 'castle' in ll else ('I' if 'imperial' in ll else 'A')))
-                        elif row['kind'] == 'tc':
-                            texts.append('TC')
-                        else:
-                            texts.append('')
-                    self.idle_canvas.add_event_markers(xs, kinds, colors=cols, texts=texts)
+        events = self.idle_events.isChecked()
+        replay = self._replay()
+
+        def compute():
+            ts = self._cached(replay, tc_idle_cumulative_timeseries, _VILLAGER_RE, window_sec=w)
+            return ts, (self._event_markers(replay, ('tc', 'age')) if events else None)
+
+        def render(result):
+            ts, markers = result
+            x, series = self._series_from_ts(ts)
+            colors = self._player_color_map()
+            self.idle_canvas.plot_lines(x, series, 'Tiempo (min)', 'Idle TC acumulado (s)', f'Idle TC — ventana {w}s', colors)
+            if markers and markers[0]:
+                xs, kinds, pids, texts = markers
+                self.idle_canvas.add_event_markers(xs, kinds, colors=self._marker_colors(pids), texts=texts)
+        self._submit('idle', compute, render)
 
     def update_res(self):
-        if not self.match or not self.replay_path:
+        if not self.match or not self.replay_path or self.tab_res not in self._tab_ready:
             return
         res = self.res_combo.currentText()
         w = int(self.res_window.currentText())
@@ -355,31 +854,43 @@ class MainWindow(QMainWindow):
         if mode == "Balance aprox." and self.res_stock.value() == 0:
             defaults = {"food": 200, "wood": 200, "gold": 100, "stone": 200}
             self.res_stock.setValue(defaults.get(res, 0))
-        ts = None
-        title = ""
+        start_at = float(self.res_stock.value())
+        events = mode == "Gasto" and self.res_events.isChecked()
         if mode == "Gasto":
-            ts = resource_spend_timeseries(self.match, resource=res, window_sec=w)
             title = f"Gasto por ventana — {w}s"
         elif mode == "Balance aprox.":
-            ts = resource_balance_timeseries(self.match, resource=res, window_sec=w, start_at=float(self.res_stock.value()))
             title = f"Saldo aprox. (spend + mercado) — ventana {w}s"
         elif mode == "Stock (sync)":
-            from aoe2stat.metrics import sync_total_resources_timeseries
-            ts = sync_total_resources_timeseries(self.replay_path, window_sec=w)
             title = f"Total recursos (sync, stock) — ventana {w}s"
         else:
-            per_player = resource_totals_postgame(self.replay_path)
-            try:
-                ts = resource_cumulative_timeseries(self.match, per_player, resource=res, window_sec=w)
-            except Exception:
-                ts = None
             title = f"{res.title()} acumulado (postgame) — ventana {w}s"
+        replay = self._replay()
+        path = replay[1]
+
+        def compute():
+            if mode == "Gasto":
+                ts = self._cached(replay, resource_spend_timeseries, resource=res, window_sec=w)
+            elif mode == "Balance aprox.":
+                # start_at is a plain offset: left out of the key so every
+                # spinbox value doesn't add another cache entry
+                ts = self._cached(replay, resource_balance_timeseries, resource=res, window_sec=w)
+                if start_at:
+                    ts = ts + start_at
+            elif mode == "Stock (sync)":
+                ts = self._cached(replay, self._sync_timeseries, path, window_sec=w)
+            else:
+                ts = self._cached(replay, self._postgame_timeseries, path, resource=res, window_sec=w)
+            return ts, (self._event_markers(replay, ('age', 'castle', 'elite', 'tech', 'tc')) if events else None)
+        self._submit('res', compute, lambda result: self._render_res(result, res, w, mode, title))
+
+    def _render_res(self, result, res: str, w: int, mode: str, title: str):
+        ts, markers = result
         # If no data or all zeros, show message
         if (ts is None) or ts.empty or ((ts.sum().sum() if not ts.empty else 0.0) == 0.0):
             msg = "Sin datos de recursos (usa 'Gasto' para estimación)" if mode != "Gasto" else "Sin datos suficientes para estimar gasto"
             self.res_canvas.draw_message(msg)
             return
-        series = {next(p.name for p in self.match.players if p.number == pid): ts[pid].values for pid in ts.columns}
+        x, series = self._series_from_ts(ts)
         ylabel_map = {
             "Gasto": f"Gasto {res}",
             "Balance aprox.": f"Saldo {res}",
@@ -388,69 +899,45 @@ class MainWindow(QMainWindow):
         }
         ylabel = ylabel_map.get(mode, f"{res}")
         colors = self._player_color_map()
-        self.res_canvas.plot_lines(ts.index/60, series, 'Tiempo (min)', ylabel, title, colors)
+        self.res_canvas.plot_lines(x, series, 'Tiempo (min)', ylabel, title, colors)
         # Add significant events on spend view
-        if mode == "Gasto" and self.res_events.isChecked():
-            ev = important_events(self.match)
-            if not ev.empty:
-                xs = []
-                kinds = []
-                cols = []
-                texts = []
-                col_map = {p.number: self._player_color_map().get(p.name, 'k') for p in self.match.players}
-                for _, row in ev.iterrows():
-                    k = row['kind']
-                    if k in ('age', 'castle', 'elite', 'tech', 'tc'):
-                        xs.append(float(row['time_sec'])/60.0)
-                        kinds.append(k)
-                        cols.append(col_map.get(int(row['player']), 'k'))
-                        # Short text per event
-                        lbl = str(row['label']).lower()
-                        if k == 'age':
-                            if 'feudal' in lbl:
-                                texts.append('F')
-                            elif 'castle' in lbl:
-                                texts.append('C')
-                            elif 'imperial' in lbl:
-                                texts.append('I')
-                            else:
-                                texts.append('A')
-                        elif k == 'castle':
-                            texts.append('C')
-                        elif k == 'elite':
-                            texts.append('E')
-                        elif k == 'tech':
-                            texts.append('T')
-                        elif k == 'tc':
-                            texts.append('TC')
-                if xs:
-                    self.res_canvas.add_event_markers(xs, kinds, colors=cols, texts=texts)
-                    # Add marker legend for clarity
-                    try:
-                        from matplotlib.lines import Line2D
-                        from matplotlib.legend import Legend
-                        handles = [
-                            Line2D([0], [0], marker='*', color='none', label='Ages (F/C/I)', markerfacecolor='k', markersize=8, linestyle='None'),
-                            Line2D([0], [0], marker='s', color='none', label='Castle', markerfacecolor='k', markersize=8, linestyle='None'),
-                            Line2D([0], [0], marker='D', color='none', label='Elite', markerfacecolor='k', markersize=8, linestyle='None'),
-                            Line2D([0], [0], marker='^', color='none', label='Tech', markerfacecolor='k', markersize=8, linestyle='None'),
-                            Line2D([0], [0], marker='v', color='none', label='TC extra', markerfacecolor='k', markersize=8, linestyle='None'),
-                        ]
-                        leg2 = Legend(self.res_canvas.ax, handles=handles, labels=[h.get_label() for h in handles], loc='upper right', framealpha=0.2, fontsize=8)
-                        if self.res_canvas.dark:
-                            leg2.get_frame().set_facecolor('#0f1116')
-                            leg2.get_frame().set_edgecolor('#5a6472')
-                        self.res_canvas.ax.add_artist(leg2)
-                    except Exception:
-                        pass
+        if markers:
+            xs, kinds, pids, texts = markers
+            if xs:
+                self.res_canvas.add_event_markers(xs, kinds, colors=self._marker_colors(pids), texts=texts)
+                # Add marker legend for clarity
+                try:
+                    from matplotlib.legend import Legend
+                    handles = [
+                        Line2D([0], [0], marker='*', color='none', label='Ages (F/C/I)', markerfacecolor='k', markersize=8, linestyle='None'),
+                        Line2D([0], [0], marker='s', color='none', label='Castle', markerfacecolor='k', markersize=8, linestyle='None'),
+                        Line2D([0], [0], marker='D', color='none', label='Elite', markerfacecolor='k', markersize=8, linestyle='None'),
+                        Line2D([0], [0], marker='^', color='none', label='Tech', markerfacecolor='k', markersize=8, linestyle='None'),
+                        Line2D([0], [0], marker='v', color='none', label='TC extra', markerfacecolor='k', markersize=8, linestyle='None'),
+                    ]
+                    leg2 = Legend(self.res_canvas.ax, handles=handles, labels=[h.get_label() for h in handles], loc='upper right', framealpha=0.2, fontsize=8)
+                    if self.res_canvas.dark:
+                        leg2.get_frame().set_facecolor('#0f1116')
+                        leg2.get_frame().set_edgecolor('#5a6472')
+                    self.res_canvas.ax.add_artist(leg2)
+                    self.res_canvas.event_artists.append(leg2)
+                except Exception:
+                    pass
 
     def _setup_score_tab(self):
         layout = QVBoxLayout(); self.tab_score.setLayout(layout)
         self.score_canvas = PlotCanvas(); layout.addWidget(self.score_canvas)
 
-    def _player_color_map(self):
-        if not self.match:
-            return {}
+    def _index_players(self):
+        # Lookups reused by every update_* for the current match
+        self._pid_to_name = {p.number: p.name for p in self.match.players}
+        self._name_to_color = self._compute_player_color_map()
+        # RGBA rows parsed once, so marker artists get ready-made color arrays
+        numbers = [p.number for p in self.match.players]
+        hexes = [self._name_to_color.get(p.name) or 'k' for p in self.match.players]
+        self._rgba_by_pid = dict(zip(numbers, to_rgba_array(hexes).astype(np.float32))) if numbers else {}
+
+    def _compute_player_color_map(self):
         aoe_colors = {
             1: '#0000FF',  # Blue
             2: '#FF0000',  # Red
@@ -463,17 +950,31 @@ class MainWindow(QMainWindow):
         }
         return {p.name: aoe_colors.get(getattr(p, 'color_id', 0), None) for p in self.match.players}
 
+    def _player_color_map(self):
+        if not self.match:
+            return {}
+        return self._name_to_color
+
     def _toggle_theme(self, checked: bool):
         self._apply_theme_all()
-        # redraw current tab
-        self._on_tab_changed(self.tabs.currentIndex())
+        # Lines and legends are restyled in place; markers and their labels take
+        # theme colors when drawn, so only a tab showing them needs a replot
+        tab = self.tabs.currentWidget()
+        canvas = next((c for c in self.all_canvases if tab.isAncestorOf(c)), None)
+        if canvas is not None and canvas.has_overlays():
+            self._on_tab_changed(self.tabs.currentIndex())
 
     def _apply_theme_all(self):
-        dark = self.dark_action.isChecked()
-        for canvas in getattr(self, 'all_canvases', []):
-            canvas.set_theme(dark)
-            canvas.set_legend_outside(self.legend_out_action.isChecked())
-        # lazily collect canvases
+        self._collect_canvases()
+        for canvas in self.all_canvases:
+            self._style_canvas(canvas)
+
+    def _style_canvas(self, canvas):
+        canvas.set_theme(self.dark_action.isChecked())
+        canvas.set_legend_outside(self.legend_out_action.isChecked())
+
+    def _collect_canvases(self):
+        # tabs are built lazily, so only some canvases may exist yet
         self.all_canvases = [
             getattr(self, 'apm_canvas', None),
             getattr(self, 'units_canvas', None),
@@ -485,10 +986,9 @@ class MainWindow(QMainWindow):
         self.all_canvases = [c for c in self.all_canvases if c is not None]
 
     def _toggle_legend_outside(self, checked: bool):
-        # Apply to all canvases and redraw current
+        # Apply to all canvases; each one redraws its own legend
         for canvas in getattr(self, 'all_canvases', []):
             canvas.set_legend_outside(checked)
-        self._on_tab_changed(self.tabs.currentIndex())
 
     def _show_glossary(self):
         text = (
@@ -503,34 +1003,57 @@ class MainWindow(QMainWindow):
 
     def update_score(self):
         # Plot score proxy distinto de stock: gasto total acumulado
-        if not self.match:
+        if not self.match or self.tab_score not in self._tab_ready:
             return
         from aoe2stat.metrics import total_spend_timeseries
-        ts = total_spend_timeseries(self.match, window_sec=60, cumulative=True)
-        if ts is None or ts.empty:
-            self.score_canvas.draw_message("Sin datos suficientes para score proxy")
-            return
-        series = {next(p.name for p in self.match.players if p.number == pid): ts[pid].values for pid in ts.columns}
-        colors = self._player_color_map()
-        self.score_canvas.plot_lines(ts.index/60, series, 'Tiempo (min)', 'Gasto total acumulado', 'Score (proxy por gasto total) — 60s', colors)
+
+        def render(ts):
+            if ts is None or ts.empty:
+                self.score_canvas.draw_message("Sin datos suficientes para score proxy")
+                return
+            x, series = self._series_from_ts(ts)
+            colors = self._player_color_map()
+            self.score_canvas.plot_lines(x, series, 'Tiempo (min)', 'Gasto total acumulado', 'Score (proxy por gasto total) — 60s', colors)
+        replay = self._replay()
+        self._submit('score', lambda: self._cached(replay, total_spend_timeseries, window_sec=60, cumulative=True), render)
 
     def update_stock(self):
-        if not self.match or not self.replay_path:
+        if not self.match or not self.replay_path or self.tab_stock not in self._tab_ready:
             return
-        from aoe2stat.metrics import sync_total_resources_timeseries, approximate_total_balance_timeseries
-        ts = sync_total_resources_timeseries(self.replay_path, window_sec=60)
-        if ts is None or ts.empty:
-            # fallback to approximate total
-            ts = approximate_total_balance_timeseries(self.match, window_sec=60)
+        from aoe2stat.metrics import approximate_total_balance_timeseries
+        replay = self._replay()
+        path = replay[1]
+
+        def compute():
+            ts = self._cached(replay, self._sync_timeseries, path, window_sec=60)
+            if ts is None or ts.empty:
+                # fallback to approximate total
+                ts = self._cached(replay, approximate_total_balance_timeseries, window_sec=60)
+            return ts
+
+        def render(ts):
             if ts is None or ts.empty:
                 self.stock_canvas.draw_message("Sin datos de Stock para este replay")
                 return
-        series = {next(p.name for p in self.match.players if p.number == pid): ts[pid].values for pid in ts.columns}
-        colors = self._player_color_map()
-        self.stock_canvas.plot_lines(ts.index/60, series, 'Tiempo (min)', 'Total recursos', 'Stock total por jugador — 60s', colors)
+            x, series = self._series_from_ts(ts)
+            colors = self._player_color_map()
+            self.stock_canvas.plot_lines(x, series, 'Tiempo (min)', 'Total recursos', 'Stock total por jugador — 60s', colors)
+        self._submit('stock', compute, render)
+
+    def _ensure_tab(self, w):
+        if w is None or w in self._tab_ready:
+            return
+        known = getattr(self, 'all_canvases', [])
+        self._tab_setup[w]()
+        self._tab_ready.add(w)
+        self._collect_canvases()
+        for canvas in self.all_canvases:
+            if canvas not in known:
+                self._style_canvas(canvas)
 
     def _on_tab_changed(self, idx: int):
         w = self.tabs.widget(idx)
+        self._ensure_tab(w)
         if w is self.tab_apm:
             self.update_apm()
         elif w is self.tab_units:
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import os
+import re
+import weakref
+from functools import lru_cache, partial
 from typing import Dict, Pattern
 
 import numpy as np
 import pandas as pd
-import ipywidgets as widgets  # type: ignore
-from IPython.display import display  # type: ignore
-import matplotlib.pyplot as plt
+
+_VILLAGER_RE = re.compile(r"villager|aldean", re.IGNORECASE)
 
 
 def render_units_widget(match, unit_patterns: Dict[str, Pattern[str]], unit_created_timeseries, plot_units_created_ts):
@@ -15,6 +18,9 @@ def render_units_widget(match, unit_patterns: Dict[str, Pattern[str]], unit_crea
     - Avoids duplicate displays/observers on repeated execution
     - Adds player filter and window size selection
     """
+    import ipywidgets as widgets  # type: ignore
+    from IPython.display import display  # type: ignore
+
     st = globals().get("UNITS_WIDGET_STATE")
     if st and isinstance(st, dict):
         try:
@@ -35,13 +41,18 @@ def render_units_widget(match, unit_patterns: Dict[str, Pattern[str]], unit_crea
         player_options = [(p.name, p.number) for p in match.players]
         player_select = widgets.SelectMultiple(options=player_options, value=tuple(pid for _, pid in player_options), description="Jugadores:", rows=len(player_options))
 
+    # Series already computed for this match, per (unit, window)
+    @lru_cache(maxsize=32)
+    def series(unit, w):
+        return unit_created_timeseries(match, unit_type=unit, window_sec=w)
+
     def handler(change=None):
         with out:
             out.clear_output(wait=True)
             unit = unit_dropdown.value
             w = int(window_dropdown.value)
-            ts = unit_created_timeseries(match, unit_type=unit, window_sec=w)
-            sel = list(player_select.value)
+            ts = series(unit, w)
+            sel = set(player_select.value)
             if ts is not None and not ts.empty:
                 keep = [pid for pid in ts.columns if pid in sel]
                 if keep:
@@ -69,6 +80,9 @@ def render_units_widget(match, unit_patterns: Dict[str, Pattern[str]], unit_crea
 
 
 def render_idle_widget(match, tc_idle_cumulative_timeseries, plot_tc_idle_cumulative):
+    import ipywidgets as widgets  # type: ignore
+    from IPython.display import display  # type: ignore
+
     st = globals().get("IDLE_WIDGET_STATE")
     if st and isinstance(st, dict):
         try:
@@ -81,11 +95,15 @@ def render_idle_widget(match, tc_idle_cumulative_timeseries, plot_tc_idle_cumula
         out = widgets.Output()
         window_dropdown = widgets.Dropdown(options=[15, 30, 45, 60, 90, 120], value=60, description="Ventana (s):")
 
+    @lru_cache(maxsize=8)
+    def series(w):
+        return tc_idle_cumulative_timeseries(match, window_sec=w)
+
     def handler(change=None):
         with out:
             out.clear_output(wait=True)
             w = int(window_dropdown.value)
-            ts = tc_idle_cumulative_timeseries(match, window_sec=w)
+            ts = series(w)
             plot_tc_idle_cumulative(ts, match, window_sec=w)
 
     window_dropdown.observe(handler, names="value")
@@ -102,6 +120,9 @@ def render_idle_widget(match, tc_idle_cumulative_timeseries, plot_tc_idle_cumula
 
 
 def render_resources_widget(match, replay_path: str, resource_cumulative_timeseries, plot_resource_cumulative):
+    import ipywidgets as widgets  # type: ignore
+    from IPython.display import display  # type: ignore
+
     st = globals().get("RES_WIDGET_STATE")
     if st and isinstance(st, dict):
         try:
@@ -117,12 +138,16 @@ def render_resources_widget(match, replay_path: str, resource_cumulative_timeser
         resource_dropdown = widgets.Dropdown(options=["food", "wood", "gold", "stone"], value="food", description="Recurso:")
         window_dropdown = widgets.Dropdown(options=[15, 30, 45, 60, 90, 120], value=60, description="Ventana (s):")
 
+    @lru_cache(maxsize=32)
+    def series(res, w):
+        return resource_cumulative_timeseries(match, resource=res, window_sec=w)
+
     def handler(change=None):
         with out:
             out.clear_output(wait=True)
             res = resource_dropdown.value
             w = int(window_dropdown.value)
-            ts = resource_cumulative_timeseries(match, resource=res, window_sec=w)
+            ts = series(res, w)
             plot_resource_cumulative(ts, match, resource=res, window_sec=w)
 
     resource_dropdown.observe(handler, names="value")
@@ -147,7 +172,6 @@ def augment_unit_patterns(unit_patterns: Dict[str, Pattern[str]]) -> Dict[str, P
 
     Returns the same dict after (in-place) augmentation.
     """
-    import re
     defaults: Dict[str, str] = {
         "Crossbowman": r"crossbow|ballestero",
         "Long Swordsman": r"long\s*sword|espad[oó]n|longsword",
@@ -164,103 +188,139 @@ def augment_unit_patterns(unit_patterns: Dict[str, Pattern[str]]) -> Dict[str, P
     }
     for k, pattern in defaults.items():
         if k not in unit_patterns:
-            unit_patterns[k] = __import__("re").compile(pattern, __import__("re").IGNORECASE)
+            unit_patterns[k] = re.compile(pattern, re.IGNORECASE)
     return unit_patterns
 
 
-def tc_idle_cumulative_timeseries_auto(match, window_sec: int = 60, base_prod_time: float = 25.0, gap_threshold: float = 27.0):
-    """Compute idle TC cumulative series using villager training events from match.actions.
-
-    This mirrors the logic used in the notebook but self-contained here.
-    """
-    import numpy as np
-    import pandas as pd
-    import re
+# builtin values that are neither str nor carry a name/unit_name attribute
+_NO_STRINGS = frozenset({int, float, bool, list, tuple, type(None)})
 
-    villager_re = re.compile(r"villager|aldean", re.IGNORECASE)
 
-    def payload_strings(obj, depth=0, max_depth=2):
+def _payload_strings(obj, max_depth=2):
+    # explicit stack, children pushed reversed: same order as a recursive walk
+    stack = [(obj, 0)]
+    while stack:
+        obj, depth = stack.pop()
         if depth > max_depth:
-            return
+            continue
         if isinstance(obj, dict):
-            for v in obj.values():
-                yield from payload_strings(v, depth + 1, max_depth)
-        else:
-            name = getattr(obj, "name", None) or getattr(obj, "unit_name", None)
-            if isinstance(name, str):
-                yield name
-            if isinstance(obj, str):
-                yield obj
-
-    def payload_matches(payload, pattern):
-        unit_obj = payload.get("unit") or {}
-        name = (
-            getattr(unit_obj, "name", None)
-            or getattr(unit_obj, "unit_name", None)
-            or (unit_obj.get("name") if isinstance(unit_obj, dict) else None)
-            or payload.get("unit_name")
-            or payload.get("object_name")
-            or payload.get("item")
-        )
-        if name and pattern.search(str(name)):
-            return True
-        for s in payload_strings(payload):
-            try:
-                if pattern.search(str(s)):
-                    return True
-            except Exception:
-                continue
-        return False
-
-    incs = {p.number: [] for p in match.players}
-    last = {p.number: None for p in match.players}
-    for act in match.actions:
-        tname = getattr(getattr(act, "type", None), "name", "")
-        if ("TRAIN" not in tname and "CREATE" not in tname and "QUEUE" not in tname and tname != "ORDER"):
+            stack.extend((v, depth + 1) for v in reversed(obj.values()))
+            continue
+        if type(obj) in _NO_STRINGS:
             continue
-        if not payload_matches(act.payload, villager_re):
+        name = getattr(obj, "name", None) or getattr(obj, "unit_name", None)
+        if isinstance(name, str):
+            yield name
+        if isinstance(obj, str):
+            yield obj
+
+
+def _payload_matches(payload, pattern):
+    unit_obj = payload.get("unit") or {}
+    name = (
+        getattr(unit_obj, "name", None)
+        or getattr(unit_obj, "unit_name", None)
+        or (unit_obj.get("name") if isinstance(unit_obj, dict) else None)
+        or payload.get("unit_name")
+        or payload.get("object_name")
+        or payload.get("item")
+    )
+    if name and pattern.search(str(name)):
+        return True
+    # fallback over nested values; _payload_strings only yields str
+    return any(pattern.search(s) for s in _payload_strings(payload))
+
+
+def _is_train_type(tname: str) -> bool:
+    return "TRAIN" in tname or "CREATE" in tname or "QUEUE" in tname or tname == "ORDER"
+
+
+# id(match) -> (weakref to match, id(actions), len(actions), arrays)
+_ACTION_ARRAYS: Dict[int, tuple] = {}
+
+
+def _build_action_arrays(match):
+    """Timestamps (s) and player numbers of villager training actions, in
+    action order. Built once per match and reused on every widget change.
+    """
+    actions = match.actions
+    entry = _ACTION_ARRAYS.get(id(match))
+    if entry is not None and entry[0]() is match and entry[1] == id(actions) and entry[2] == len(actions):
+        return entry[3]
+    # keyed by id(act.type): actions share enum members, all alive during the loop
+    is_train: Dict[int, bool] = {}
+    times, pids = [], []
+    for act in actions:
+        act_type = getattr(act, "type", None)
+        ok = is_train.get(id(act_type))
+        if ok is None:
+            ok = is_train[id(act_type)] = _is_train_type(getattr(act_type, "name", ""))
+        if not ok or not _payload_matches(act.payload, _VILLAGER_RE):
             continue
         pid = getattr(getattr(act, "player", None), "number", None)
         if pid is None:
             continue
-        t = act.timestamp.total_seconds()
-        if last[pid] is not None:
-            gap = t - last[pid]
-            if gap > gap_threshold:
-                inc = max(0.0, gap - base_prod_time)
-                incs[pid].append((t, inc))
-        last[pid] = t
-
-    all_times = []
-    for pairs in incs.values():
-        all_times += [t for t, _ in pairs]
-    if not all_times:
+        times.append(act.timestamp.total_seconds())
+        pids.append(pid)
+    arrays = (np.asarray(times, dtype=np.float64), np.asarray(pids, dtype=np.int64))
+    for key in [k for k, e in _ACTION_ARRAYS.items() if e[0]() is None]:
+        del _ACTION_ARRAYS[key]
+    try:
+        _ACTION_ARRAYS[id(match)] = (weakref.ref(match), id(actions), len(actions), arrays)
+    except TypeError:
+        pass  # not weak-referenceable: recompute next time
+    return arrays
+
+
+def tc_idle_cumulative_timeseries_auto(match, window_sec: int = 60, base_prod_time: float = 25.0, gap_threshold: float = 27.0):
+    """Compute idle TC cumulative series using villager training events from match.actions.
+
+    This mirrors the logic used in the notebook but self-contained here.
+    """
+    t, pid = _build_action_arrays(match)
+    # group by player keeping action order; gap to that player's previous event
+    order = np.argsort(pid, kind="stable")
+    gap = np.diff(t[order])
+    hit = (pid[order][1:] == pid[order][:-1]) & (gap > gap_threshold)
+    inc_t = t[order][1:][hit]
+    inc_pid = pid[order][1:][hit]
+    inc = np.maximum(0.0, gap[hit] - base_prod_time)
+
+    if not inc_t.size:
         return pd.DataFrame()
-    max_t = max(all_times)
+    max_t = inc_t.max()
     bins = np.arange(0, max_t + window_sec, window_sec)
-    out = {}
-    for pid, pairs in incs.items():
-        if not pairs:
-            continue
-        pairs.sort(key=lambda x: x[0])
-        t_arr = np.array([t for t, _ in pairs], dtype=float)
-        inc_arr = np.array([v for _, v in pairs], dtype=float)
-        cum = np.cumsum(inc_arr)
-        s = pd.Series(cum, index=t_arr)
-        out[pid] = s.reindex(bins, method="ffill").fillna(0.0).values[:-1]
-    ts = pd.DataFrame(out, index=bins[:-1])
+    # one stable sort by (player, time): each player's increments are a contiguous slice
+    order = np.lexsort((inc_t, inc_pid))
+    inc_t, inc_pid, inc = inc_t[order], inc_pid[order], inc[order]
+    players = list(dict.fromkeys(p.number for p in match.players))
+    starts = np.searchsorted(inc_pid, players, side="left")
+    ends = np.searchsorted(inc_pid, players, side="right")
+    slices = [(pid_, lo, hi) for pid_, lo, hi in zip(players, starts, ends) if hi > lo]
+    pids = [pid_ for pid_, _, _ in slices]
+    out = np.zeros((len(bins) - 1, len(pids)))
+    for j, (_, lo, hi) in enumerate(slices):
+        t_arr = inc_t[lo:hi]
+        cum = np.cumsum(inc[lo:hi])
+        # forward-fill onto window starts: last increment at or before each start
+        idx = np.searchsorted(t_arr, bins[:-1], side="right") - 1
+        hit = idx >= 0
+        out[hit, j] = cum[idx[hit]]
+    ts = pd.DataFrame(out, index=bins[:-1], columns=pids)
     ts.index.name = "time_sec"
     return ts
 
 
-def plot_tc_idle_cumulative(ts, match, window_sec: int = 60):
+def plot_tc_idle_cumulative(ts, match, window_sec: int = 60, name_map: Dict[int, str] | None = None):
     if ts.empty:
         print("Sin datos suficientes para idle TC acumulado.")
         return
+    import matplotlib.pyplot as plt
+
+    names = name_map or {p.number: p.name for p in match.players}
     plt.figure(figsize=(10, 6))
     for pid in ts.columns:
-        name = next(p.name for p in match.players if p.number == pid)
-        plt.plot(ts.index / 60, ts[pid], label=name)
+        plt.plot(ts.index / 60, ts[pid], label=names[pid])
     plt.xlabel("Tiempo (min)")
     plt.ylabel("Idle TC acumulado (s)")
     plt.title(f"Idle TC acumulado — ventana {window_sec}s")
@@ -270,7 +330,9 @@ def plot_tc_idle_cumulative(ts, match, window_sec: int = 60):
 
 
 def render_idle_widget_auto(match):
-    return render_idle_widget(match, tc_idle_cumulative_timeseries_auto, plot_tc_idle_cumulative)
+    # player names looked up once, not on every widget change
+    names = {p.number: p.name for p in match.players}
+    return render_idle_widget(match, tc_idle_cumulative_timeseries_auto, partial(plot_tc_idle_cumulative, name_map=names))
 
 
 def resource_totals_postgame(replay_path: str):
@@ -278,55 +340,65 @@ def resource_totals_postgame(replay_path: str):
     with open(replay_path, "rb") as fh:
         data = _mgz_fast.postgame(fh)
 
-    def find_totals(obj):
-        if isinstance(obj, dict):
-            keys = set(k.lower() for k in obj.keys())
-            if {"food", "wood", "gold", "stone"}.issubset(keys):
-                return obj
-            for v in obj.values():
-                r = find_totals(v)
-                if r:
-                    return r
-        elif isinstance(obj, list):
-            for v in obj:
-                r = find_totals(v)
-                if r:
-                    return r
+    def find_totals(root):
+        target = {"food", "wood", "gold", "stone"}
+        stack = [root]
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, dict):
+                if target <= {k.lower() for k in obj}:
+                    return obj
+                stack.extend(reversed(obj.values()))
+            elif isinstance(obj, list):
+                stack.extend(reversed(obj))
         return None
 
     return data, find_totals(data)
 
 
-def resource_cumulative_timeseries_auto(match, replay_path: str, resource: str = "food", window_sec: int = 60):
-    import numpy as np
-    import pandas as pd
-    res = resource.lower()
-    if res not in ("food", "wood", "gold", "stone"):
-        raise ValueError("Recurso no soportado")
+def _postgame_totals(replay_path: str):
+    """Totals found by resource_totals_postgame, or None; parsed once per file."""
+    try:
+        st = os.stat(replay_path)
+    except OSError:
+        return None  # unreadable: resource_totals_postgame would fail too
+    return _postgame_totals_cached(str(replay_path), st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=8)
+def _postgame_totals_cached(replay_path: str, mtime_ns, size):
     try:
         _, totals = resource_totals_postgame(replay_path)
     except Exception:
         totals = None
+    return totals
+
+
+def resource_cumulative_timeseries_auto(match, replay_path: str, resource: str = "food", window_sec: int = 60):
+    res = resource.lower()
+    if res not in ("food", "wood", "gold", "stone"):
+        raise ValueError("Recurso no soportado")
+    totals = _postgame_totals(replay_path)
     max_t = match.duration.total_seconds()
     bins = np.arange(0, max_t + window_sec, window_sec)
-    out = {}
-    for p in match.players:
-        pid = p.number
-        total_val = float((totals or {}).get(res, 0.0)) if isinstance(totals, dict) else 0.0
-        out[pid] = np.linspace(0.0, total_val, num=len(bins) - 1)
-    ts = pd.DataFrame(out, index=bins[:-1])
+    pids = list(dict.fromkeys(p.number for p in match.players))
+    total_val = float((totals or {}).get(res, 0.0)) if isinstance(totals, dict) else 0.0
+    line = np.linspace(0.0, total_val, num=len(bins) - 1)
+    ts = pd.DataFrame(np.repeat(line[:, None], len(pids), axis=1), index=bins[:-1], columns=pids)
     ts.index.name = "time_sec"
     return ts
 
 
-def plot_resource_cumulative(ts, match, resource: str, window_sec: int = 60):
+def plot_resource_cumulative(ts, match, resource: str, window_sec: int = 60, name_map: Dict[int, str] | None = None):
     if ts.empty:
         print("Sin datos suficientes para recursos acumulados.")
         return
+    import matplotlib.pyplot as plt
+
+    names = name_map or {p.number: p.name for p in match.players}
     plt.figure(figsize=(10, 6))
     for pid in ts.columns:
-        name = next(p.name for p in match.players if p.number == pid)
-        plt.plot(ts.index / 60, ts[pid], label=name)
+        plt.plot(ts.index / 60, ts[pid], label=names[pid])
     plt.xlabel("Tiempo (min)")
     plt.ylabel(f"{resource.title()} acumulado")
     plt.title(f"{resource.title()} acumulado — ventana {window_sec}s")
@@ -338,5 +410,6 @@ def plot_resource_cumulative(ts, match, resource: str, window_sec: int = 60):
 def render_resources_widget_auto(match, replay_path: str):
     def _ts(match_, resource: str, window_sec: int):
         return resource_cumulative_timeseries_auto(match_, replay_path, resource=resource, window_sec=window_sec)
-    return render_resources_widget(match, replay_path, _ts, plot_resource_cumulative)
+    names = {p.number: p.name for p in match.players}
+    return render_resources_widget(match, replay_path, _ts, partial(plot_resource_cumulative, name_map=names))
 